@@ -0,0 +1,5 @@
+"""Serving helpers shared by the Streamlit app and the headless tools.
+
+Modules are imported on demand so that ``app.py`` only pays for what a page
+actually uses.
+"""
@@ -0,0 +1,336 @@
+"""Asynchronous, batched audit log of every prediction, stored in SQLite.
+
+Callers hand ``record`` the rows they scored and return immediately; a single
+writer thread collects pending requests and inserts them with ``executemany``
+in one transaction per flush, into a WAL-mode database indexed by disease and
+time.  Each stored row holds the time, disease, caller (``app``, ``api``,
+``batch``, ``screening``), model version, the inputs in schema order, the
+label, the positive-class probability, the request latency and, for failed
+requests, the error.
+
+Memory is bounded by ``max_rows`` pending rows.  When the buffer is full,
+interactive callers drop the record (counted in ``dropped`` and exported by
+``mdp.metrics``) rather than stall a page or request, while the sources in
+``BLOCKING_SOURCES`` -- the batch scorer -- wait for the writer instead.
+
+    python -m mdp.audit recent --disease cancer -n 20
+
+The database lives at ``audit.sqlite3`` in the repository root; set
+``MDP_AUDIT_DB`` to another path, or to ``off`` to disable auditing.  Auditing
+never fails a prediction: when the database cannot be opened or written, the
+error is logged, the rows are counted in ``failed`` and the log disables itself.
+"""
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from mdp import metrics
+from mdp.diseases import ROOT_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(ROOT_DIR, 'audit.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    disease TEXT NOT NULL,
+    source TEXT NOT NULL,
+    model_version TEXT,
+    inputs TEXT NOT NULL,
+    label INTEGER,
+    probability REAL,
+    latency_ms REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS predictions_disease_ts ON predictions (disease, ts);
+CREATE INDEX IF NOT EXISTS predictions_ts ON predictions (ts);
+"""
+
+SOURCES = ('app', 'screening', 'api', 'batch')
+# Sources that wait for buffer space instead of dropping records.
+BLOCKING_SOURCES = ('batch',)
+
+COLUMNS = ('id', 'ts', 'disease', 'source', 'model_version', 'inputs', 'label', 'probability',
+           'latency_ms', 'error')
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class AuditLog:
+
+    def __init__(self, path=DEFAULT_PATH, max_rows=20000, batch_rows=1000, flush_interval=0.5,
+                 block_timeout=30.0):
+        self.path = path
+        self.max_rows = max_rows
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self._buffer = deque()
+        self._pending = 0      # rows buffered or being written
+        self._waiting = 0      # callers blocked on the writer: flush() or a full buffer
+        self._closed = False
+        self._cond = threading.Condition()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.transactions = 0
+        self.disabled = False
+        self._thread = None
+        try:
+            connection = connect(path)
+            try:
+                connection.executescript(SCHEMA)
+            finally:
+                connection.close()
+        except (sqlite3.Error, OSError):
+            logger.exception('Cannot open the audit database %s; predictions will not be audited', path)
+            self.disabled = True
+            return
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, disease, source, X, labels=None, proba=None, seconds=None, model_version=None,
+               error=None, block=None):
+        """Queue one scored request; returns False when it was dropped."""
+        block = source in BLOCKING_SOURCES if block is None else block
+        rows = len(X)
+        item = (time.time(), disease, source, model_version, X, labels, proba, seconds, error)
+        with self._cond:
+            if self.disabled:
+                self.failed += rows
+                return False
+            if block and not self._closed and not self._fits(rows):
+                self._waiting += 1
+                self._cond.notify_all()
+                try:
+                    self._cond.wait_for(lambda: self._fits(rows) or self._closed, self.block_timeout)
+                finally:
+                    self._waiting -= 1
+            if self._closed or self.disabled or not self._fits(rows):
+                self.dropped += rows
+                return False
+            self._buffer.append(item)
+            self._pending += rows
+            if self._pending >= self.batch_rows:
+                self._cond.notify_all()
+        return True
+
+    def _fits(self, rows):
+        # A request larger than the whole buffer is still accepted into an empty one.
+        return self._pending + rows <= self.max_rows or self._pending == 0
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed; returns False on timeout."""
+        with self._cond:
+            self._waiting += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._pending == 0, timeout)
+            finally:
+                self._waiting -= 1
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'disabled': self.disabled,
+            'pending': self._pending,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'transactions': self.transactions,
+        }
+
+    def recent(self, disease=None, source=None, since=None, limit=50):
+        return recent(self.path, disease=disease, source=source, since=since, limit=limit)
+
+    # --- Writer ---
+    def _run(self):
+        try:
+            connection = connect(self.path)
+        except (sqlite3.Error, OSError):
+            logger.exception('Cannot open the audit database %s; predictions will not be audited', self.path)
+            self._disable()
+            return
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closed or self._waiting
+                                        or self._pending >= self.batch_rows, self.flush_interval)
+                    items = list(self._buffer)
+                    self._buffer.clear()
+                    closed = self._closed
+                rows = sum(len(item[4]) for item in items)
+                if items:
+                    self._write(connection, items, rows)
+                with self._cond:
+                    self._pending -= rows
+                    self._cond.notify_all()
+                if closed and not self._buffer:
+                    return
+        finally:
+            connection.close()
+
+    def _disable(self):
+        with self._cond:
+            self.disabled = True
+            self.failed += self._pending
+            self._buffer.clear()
+            self._pending = 0
+            self._cond.notify_all()
+
+    def _write(self, connection, items, rows):
+        try:
+            with connection:
+                connection.executemany(
+                    'INSERT INTO predictions (ts, disease, source, model_version, inputs, label, '
+                    'probability, latency_ms, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    _expand(items))
+        except Exception:
+            self.failed += rows
+            logger.exception('Could not write %d audit rows to %s', rows, self.path)
+        else:
+            self.written += rows
+            self.transactions += 1
+
+
+def _expand(items):
+    for ts, disease, source, version, X, labels, proba, seconds, error in items:
+        latency_ms = None if seconds is None else seconds * 1000
+        X = X.tolist() if hasattr(X, 'tolist') else X
+        labels = labels.tolist() if hasattr(labels, 'tolist') else labels
+        proba = proba.tolist() if hasattr(proba, 'tolist') else proba
+        for i, row in enumerate(X):
+            yield (ts, disease, source, version, json.dumps(row),
+                   None if labels is None else labels[i], None if proba is None else proba[i],
+                   latency_ms, error)
+
+
+def recent(path=DEFAULT_PATH, disease=None, source=None, since=None, limit=50):
+    """Most recent audit rows first, as dicts with the inputs decoded."""
+    clauses, params = [], []
+    for column, value, op in (('disease', disease, '='), ('source', source, '='), ('ts', since, '>=')):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    try:
+        rows = connection.execute(f"SELECT {', '.join(COLUMNS)} FROM predictions {where} "
+                                  f"ORDER BY ts DESC, id DESC LIMIT ?", params + [limit]).fetchall()
+    finally:
+        connection.close()
+    history = [dict(zip(COLUMNS, row)) for row in rows]
+    for entry in history:
+        entry['inputs'] = json.loads(entry['inputs'])
+    return history
+
+
+# --- Shared instance ---
+_log = None
+_log_guard = threading.Lock()
+
+
+def get_audit_log():
+    """The process-wide log, or None when ``MDP_AUDIT_DB=off``."""
+    global _log
+    if _log is None:
+        path = os.environ.get('MDP_AUDIT_DB', DEFAULT_PATH)
+        if path == 'off':
+            return None
+        with _log_guard:
+            if _log is None:
+                _log = AuditLog(path)
+                atexit.register(_log.close)
+                metrics.REGISTRY.add_collector('audit', _collect)
+    return _log
+
+
+def record(disease, source, X, labels=None, proba=None, seconds=None, model_version=None, error=None,
+           block=None):
+    """Queue a scored request on the shared log; a no-op when auditing is off.
+
+    Never raises: the prediction being recorded has already been made.
+    """
+    try:
+        log = get_audit_log()
+        if log is None:
+            return False
+        return log.record(disease, source, X, labels, proba, seconds, model_version, error, block)
+    except Exception:
+        logger.exception('Could not queue an audit record for %s', disease)
+        if _log is not None:
+            _log.failed += len(X)
+        return False
+
+
+def scored(disease, source, X, predict, model_version=None):
+    """Return ``predict(X)``, recording the request -- or its failure -- on the shared log."""
+    start = time.perf_counter()
+    try:
+        labels, proba = predict(X)
+    except Exception as e:
+        record(disease, source, X, seconds=time.perf_counter() - start, model_version=model_version,
+               error=f"{type(e).__name__}: {e}")
+        raise
+    record(disease, source, X, labels, proba, time.perf_counter() - start, model_version)
+    return labels, proba
+
+
+def flush(timeout=None):
+    log = get_audit_log()
+    return True if log is None else log.flush(timeout)
+
+
+def _collect():
+    stats = _log.stats()
+    return [
+        ('mdp_audit_pending_rows', 'gauge', 'Audit rows waiting for the writer.', [({}, stats['pending'])]),
+        ('mdp_audit_written_total', 'counter', 'Audit rows committed.', [({}, stats['written'])]),
+        ('mdp_audit_dropped_total', 'counter', 'Audit rows dropped because the buffer was full.',
+         [({}, stats['dropped'])]),
+        ('mdp_audit_failed_total', 'counter', 'Audit rows lost to database errors.', [({}, stats['failed'])]),
+        ('mdp_audit_disabled', 'gauge', '1 when the audit database could not be used.',
+         [({}, int(stats['disabled']))]),
+    ]
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Query the prediction audit log.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    recent_parser = commands.add_parser('recent', help='print the most recent predictions as JSON lines')
+    recent_parser.add_argument('--disease')
+    recent_parser.add_argument('--source', choices=SOURCES)
+    recent_parser.add_argument('-n', '--limit', type=int, default=20)
+    recent_parser.add_argument('--db', default=os.environ.get('MDP_AUDIT_DB', DEFAULT_PATH))
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"no audit database at {args.db}")
+    for entry in recent(args.db, disease=args.disease, source=args.source, limit=args.limit):
+        print(json.dumps(entry))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
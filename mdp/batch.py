@@ -0,0 +1,153 @@
+"""Out-of-core batch scoring of CSV files in the ``dataset/*.csv`` layout.
+
+The input is streamed in fixed-size chunks, chunks are scored on a process
+pool, and results are appended to the output as soon as the oldest pending
+chunk finishes.  At most ``2 * workers`` chunks are in flight, so memory stays
+bounded no matter how large the input is.
+
+    python -m mdp.batch kidney patients.csv -o scored.csv --chunksize 50000 --workers 8
+
+Each output row carries the input row number, the record id when the layout has
+one, the predicted label, the positive-class probability when the model has
+one, and, for rows that could not be scored, every invalid field reported by
+the disease's ``mdp.schema`` input schema.
+
+A blank cell in a required field is such an error, and most rows of
+``dataset/kidney.csv`` have one.  ``--fill-missing`` scores those rows anyway:
+blank cells get the stand-ins of ``mdp.datasets.fill_values`` (the training
+rows' mean, or most common value for whole-number and categorical fields), and
+a ``filled`` column lists the fields that were filled in each row.
+"""
+import functools
+import argparse
+import collections
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mdp import audit, datasets, service
+from mdp.diseases import DISEASES
+from mdp.registry import get_registry
+from mdp.schema import SchemaError, get_schema
+
+OUTPUT_COLUMNS = ['row', 'id', 'prediction', 'probability', 'error']
+# With fill_missing, the fields filled in go before the error.
+FILLED_COLUMNS = OUTPUT_COLUMNS[:-1] + ['filled'] + OUTPUT_COLUMNS[-1:]
+
+
+@functools.lru_cache(maxsize=None)
+def _schema(name, fill_missing):
+    schema = get_schema(name)
+    return schema.with_missing(datasets.fill_values(name)) if fill_missing else schema
+
+
+def score_frame(name, frame, fill_missing=False):
+    """Score one raw chunk; returns output rows as lists in ``OUTPUT_COLUMNS`` order.
+
+    With ``fill_missing`` blank cells are filled in (see the module docstring)
+    and the rows follow ``FILLED_COLUMNS``.
+    """
+    schema = _schema(name, fill_missing)
+    result = schema.convert(frame)
+    valid = result.valid
+
+    labels = np.full(len(frame), None, dtype=object)
+    proba = np.full(len(frame), None, dtype=object)
+    if valid.any():
+        valid_labels, valid_proba = service.predict(name, result.X[valid], cache=False, source='batch')
+        labels[valid] = valid_labels.tolist()
+        if valid_proba is not None:
+            proba[valid] = np.round(valid_proba, 6).tolist()
+
+    messages = collections.defaultdict(list)
+    for error in result.errors:
+        messages[error.row].append(f"{error.field}: {error.message}")
+
+    id_column = datasets.ID_COLUMNS.get(name)
+    ids = frame[id_column].tolist() if id_column in frame else [None] * len(frame)
+    # Pool workers exit without running atexit hooks, so commit the chunk's audit rows now.
+    audit.flush()
+    rows = [[row, ids[i], labels[i], proba[i], '; '.join(messages[i]) if i in messages else None]
+            for i, row in enumerate(frame.index)]
+    if fill_missing:
+        for row, filled in zip(rows, result.filled):
+            row.insert(-1, ', '.join(name for name, cell in zip(schema.names, filled) if cell) or None)
+    return rows
+
+
+def _warm_up(name, fill_missing=False):
+    get_registry().predictor(name)
+    _schema(name, fill_missing)
+
+
+def score_file(name, input_path, output_path, chunksize=10000, workers=None, fill_missing=False):
+    """Score ``input_path`` into ``output_path``; returns ``(rows, errors)``."""
+    workers = os.cpu_count() if workers is None else workers
+    # Reading everything as text keeps dtypes stable across chunks; the schema parses.
+    chunks = datasets.read_csv(name, input_path, chunksize=chunksize, dtype=str)
+    total = errors = 0
+
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out)
+        writer.writerow(FILLED_COLUMNS if fill_missing else OUTPUT_COLUMNS)
+
+        def write(rows):
+            nonlocal total, errors
+            writer.writerows(rows)
+            out.flush()
+            total += len(rows)
+            errors += sum(1 for row in rows if row[-1])
+
+        if workers <= 1:
+            for frame in chunks:
+                write(score_frame(name, frame, fill_missing))
+            return total, errors
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_warm_up,
+                                 initargs=(name, fill_missing)) as pool:
+            pending = collections.deque()
+            for frame in chunks:
+                pending.append(pool.submit(score_frame, name, frame, fill_missing))
+                if len(pending) >= 2 * workers:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+    return total, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV in the dataset/*.csv layout.')
+    parser.add_argument('disease', choices=sorted(DISEASES))
+    parser.add_argument('input', help='CSV with the same columns as dataset/<disease>.csv')
+    parser.add_argument('-o', '--output', required=True, help='where to write the predictions CSV')
+    parser.add_argument('--chunksize', type=int, default=10000, help='rows per chunk (default: 10000)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: CPU count; 1 scores in-process)')
+    parser.add_argument('--fill-missing', action='store_true',
+                        help='score rows with blank cells by filling them from the training data '
+                             '(default: report them as errors, "a value is required")')
+    args = parser.parse_args(argv)
+
+    try:
+        get_registry().predictor(args.disease)
+    except SchemaError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    total, errors = score_file(args.disease, args.input, args.output, args.chunksize, args.workers,
+                               args.fill_missing)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {total} rows ({errors} with errors) in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else 0:.0f} rows/s) -> {args.output}", file=sys.stderr)
+    if errors and not args.fill_missing:
+        print(f"{errors} rows were not scored; see the error column, or rerun with --fill-missing "
+              f"to fill blank cells", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
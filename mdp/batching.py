@@ -0,0 +1,116 @@
+"""Adaptive micro-batching of concurrent prediction requests.
+
+Each model gets one ``MicroBatcher``: request threads enqueue their rows and
+wait on a future, and a single worker thread drains the queue into one
+vectorized ``score`` call.  The worker only waits for more rows (up to
+``max_wait`` seconds) when recent batches show that requests are actually
+arriving concurrently; a lone request is dispatched immediately.  The queue is
+bounded, and ``submit`` raises ``Overloaded`` instead of letting latency grow
+without limit.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Overloaded(RuntimeError):
+    """The batcher's queue is full or it is shutting down; the caller should retry later."""
+
+
+class MicroBatcher:
+
+    def __init__(self, name, score_fn, max_batch=64, max_wait=0.002, max_queue=1024):
+        self.name = name
+        self.score_fn = score_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._accepting = True
+        self._avg_batch = 1.0
+        self._thread = threading.Thread(target=self._run, name=f'batcher-{name}', daemon=True)
+        self.batches = 0
+        self.rows = 0
+        self.rejected = 0
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, X):
+        """Queue a 2D array of rows; the future resolves to ``(labels, probabilities)``."""
+        future = Future()
+        if not self._accepting:
+            raise Overloaded(f"The '{self.name}' model is shutting down.")
+        try:
+            self._queue.put_nowait((np.asarray(X, dtype=np.float64), future))
+        except queue.Full:
+            self.rejected += 1
+            raise Overloaded(f"Too many pending requests for the '{self.name}' model.") from None
+        return future
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stop(self, timeout=None):
+        """Stop accepting rows, finish everything already queued, then stop the worker."""
+        self._accepting = False
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # --- Worker ---
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            size = len(item[0])
+            # Wait for company only when recent traffic shows requests arrive together.
+            deadline = time.monotonic() + (self.max_wait if self._avg_batch > 1.5 else 0.0)
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._avg_batch = 0.8 * self._avg_batch + 0.2 * len(batch)
+            self._dispatch(batch)
+        # Anything that slipped in behind the stop marker is refused, not left hanging.
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[1].set_exception(Overloaded(f"The '{self.name}' model is shutting down."))
+
+    def _dispatch(self, batch):
+        try:
+            X = np.concatenate([rows for rows, _ in batch]) if len(batch) > 1 else batch[0][0]
+            labels, proba = self.score_fn(X)
+        except Exception as e:
+            logger.exception("Batch of %d requests for '%s' failed", len(batch), self.name)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.rows += len(X)
+        start = 0
+        for rows, future in batch:
+            stop = start + len(rows)
+            future.set_result((labels[start:stop], None if proba is None else proba[start:stop]))
+            start = stop
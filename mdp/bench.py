@@ -0,0 +1,319 @@
+"""Reproducible performance benchmarks, using ``dataset/*.csv`` as workloads.
+
+    python -m mdp.bench run -o bench.json                # measure everything
+    python -m mdp.bench run --diseases cancer kidney     # a subset
+    python -m mdp.bench compare baseline.json bench.json # flag regressions
+
+``run`` measures, and writes as JSON:
+
+* ``imports``   -- bare interpreter start-up, then the cold import time of all of
+  ``app.py``'s dependencies together and of each one alone, in fresh
+  interpreters (median of ``--repeat`` processes);
+* ``models``    -- per disease, in a fresh interpreter: plain ``pickle.load`` time
+  of the ``.sav`` and the resident memory it adds, then the registry's cold load
+  time and memory (which may use the linear artifact and compiles forests);
+* ``latency``   -- p50/p99 of single-row ``mdp.service.predict`` calls, cycling
+  over the disease's dataset rows with the prediction cache bypassed;
+* ``throughput`` -- rows per second at several batch sizes.
+
+``compare`` checks every metric of a run against a stored baseline and exits
+with status 1 when any got worse by more than ``--threshold`` (relative), is
+missing from the run, or when the run reports an error the baseline did not.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from mdp.diseases import DISEASES, ROOT_DIR
+
+IMPORTS = ['numpy', 'pandas', 'sklearn', 'streamlit', 'streamlit_option_menu', 'mdp.registry']
+BATCH_SIZES = [1, 16, 256, 4096]
+
+# Metrics where a larger value is better; every other metric is a cost.
+HIGHER_IS_BETTER = ('rows_per_second',)
+
+
+# --- Measurements ---
+def rss_bytes():
+    """Current resident set size of this process, or the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _probe(code):
+    """Run ``code`` in a fresh interpreter and return the JSON it prints last."""
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, capture_output=True,
+                         text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _median(values):
+    return float(np.median(values)) if values else None
+
+
+def measure_imports(modules=IMPORTS, repeat=3):
+    startup = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        startup.append(time.perf_counter() - start)
+    results = {'interpreter_seconds': _median(startup)}
+    for module in [', '.join(modules)] + list(modules):
+        try:
+            seconds = [_probe(_IMPORT_PROBE % module)['seconds'] for _ in range(repeat)]
+        except subprocess.CalledProcessError as e:
+            results[module] = {'error': e.stderr.strip().splitlines()[-1]}
+        else:
+            results[module] = {'seconds': _median(seconds)}
+    return results
+
+
+def measure_model(name, repeat=3):
+    try:
+        runs = [_probe(_MODEL_PROBE % {'name': name}) for _ in range(repeat)]
+    except subprocess.CalledProcessError as e:
+        return {'error': e.stderr.strip().splitlines()[-1]}
+    result = {key: _median([run[key] for run in runs if run.get(key) is not None]) for key in runs[0]
+              if key not in ('error', 'file_bytes')}
+    result['file_bytes'] = runs[0]['file_bytes']
+    if runs[0].get('error'):
+        result['error'] = runs[0]['error']
+    return result
+
+
+def workload(name):
+    """Valid rows of ``dataset/<name>.csv`` converted by the disease's schema."""
+    from mdp import datasets
+    from mdp.schema import get_schema
+
+    result = get_schema(name).convert(datasets.read_csv(name, dtype=str))
+    return result.X[result.valid]
+
+
+def measure_latency(name, X, calls=2000, budget=5.0):
+    from mdp import service
+
+    service.predict(name, X[:1], cache=False)  # load and warm up outside the timings
+    timings = []
+    deadline = time.perf_counter() + budget
+    for i in range(calls):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        service.predict(name, row, cache=False)
+        timings.append(time.perf_counter() - start)
+        if start > deadline:
+            break
+    timings = np.array(timings) * 1e6
+    return {'calls': len(timings), 'p50_us': float(np.percentile(timings, 50)),
+            'p99_us': float(np.percentile(timings, 99)), 'mean_us': float(timings.mean())}
+
+
+def measure_throughput(name, X, batch_sizes=BATCH_SIZES, budget=1.0):
+    from mdp import service
+
+    results = {}
+    for size in batch_sizes:
+        batch = np.resize(X, (size, X.shape[1]))  # repeats the dataset rows as needed
+        rows = 0
+        start = time.perf_counter()
+        while True:
+            service.predict(name, batch, cache=False)
+            rows += size
+            elapsed = time.perf_counter() - start
+            if elapsed >= budget:
+                break
+        results[str(size)] = {'rows_per_second': rows / elapsed}
+    return results
+
+
+def run(diseases=None, repeat=3, latency_calls=2000, throughput_budget=1.0, log=None):
+    from mdp.schema import SchemaError
+
+    log = log or (lambda message: None)
+    diseases = list(diseases or DISEASES)
+    report = {'environment': environment(), 'imports': {}, 'models': {}, 'latency': {}, 'throughput': {}}
+    log('imports')
+    report['imports'] = measure_imports(repeat=repeat)
+    for name in diseases:
+        log(name)
+        report['models'][name] = measure_model(name, repeat=repeat)
+        X = workload(name)
+        try:
+            report['latency'][name] = measure_latency(name, X, calls=latency_calls)
+        except SchemaError as e:
+            report['latency'][name] = {'error': str(e)}
+            continue
+        report['throughput'][name] = measure_throughput(name, X, budget=throughput_budget)
+    return report
+
+
+def environment():
+    import sklearn
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+_IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import %s
+print('{"seconds": %%r}' %% (time.perf_counter() - start))
+"""
+
+_MODEL_PROBE = """
+import gc, json, os, pickle, time
+import numpy, pandas, sklearn.ensemble, sklearn.svm, sklearn.linear_model
+from mdp.bench import rss_bytes
+from mdp.registry import ModelRegistry
+registry = ModelRegistry()
+path = registry.path_for(%(name)r)
+result = {'file_bytes': os.path.getsize(path)}
+gc.collect()
+before = rss_bytes()
+start = time.perf_counter()
+with open(path, 'rb') as file:
+    model = pickle.load(file)
+result['unpickle_seconds'] = time.perf_counter() - start
+result['unpickle_rss_bytes'] = rss_bytes() - before
+del model
+gc.collect()
+before = rss_bytes()
+start = time.perf_counter()
+try:
+    entry = registry.entry(%(name)r)
+except Exception as e:
+    result['error'] = str(e)
+else:
+    result['load_seconds'] = time.perf_counter() - start
+    result['load_rss_bytes'] = rss_bytes() - before
+    result['resident_bytes'] = entry.nbytes
+print(json.dumps(result))
+"""
+
+
+# --- Comparison ---
+def flatten(report, prefix=''):
+    """Numeric leaves of ``report`` as ``{'a/b/c': value}``, skipping the environment."""
+    metrics = {}
+    for key, value in report.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if path == 'environment':
+            continue
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and not path.endswith('/calls'):
+            metrics[path] = value
+    return metrics
+
+
+def errors(report, prefix=''):
+    """``error`` entries of ``report`` as ``{'a/b/error': message}``."""
+    found = {}
+    for key, value in report.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            found.update(errors(value, path))
+        elif key == 'error':
+            found[path] = str(value)
+    return found
+
+
+def compare(baseline, current, threshold=0.25):
+    """Return ``(regressions, improvements)`` as lists of ``(metric, old, new, change)``.
+
+    A metric of the baseline that the current report lacks is a regression
+    with ``new`` None, and so is an ``error`` entry the baseline did not have,
+    with ``old`` None and the message as ``new``; ``change`` is None for both.
+    """
+    old, new = flatten(baseline), flatten(current)
+    regressions, improvements = [], []
+    for metric in sorted(old.keys() - new.keys()):
+        regressions.append((metric, old[metric], None, None))
+    old_errors = errors(baseline)
+    for metric, message in sorted(errors(current).items()):
+        if metric not in old_errors:
+            regressions.append((metric, None, message, None))
+    for metric in sorted(old.keys() & new.keys()):
+        before, after = old[metric], new[metric]
+        if not before:
+            continue
+        change = (after - before) / abs(before)
+        worse = change < -threshold if metric.endswith(HIGHER_IS_BETTER) else change > threshold
+        better = change > threshold if metric.endswith(HIGHER_IS_BETTER) else change < -threshold
+        if worse:
+            regressions.append((metric, before, after, change))
+        elif better:
+            improvements.append((metric, before, after, change))
+    return regressions, improvements
+
+
+# --- CLI ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark model loading, latency and throughput.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='measure and write a JSON report')
+    run_parser.add_argument('--diseases', nargs='*', choices=sorted(DISEASES), default=None)
+    run_parser.add_argument('-o', '--output', help='where to write the report (default: stdout)')
+    run_parser.add_argument('--repeat', type=int, default=3, help='fresh processes per cold-start metric')
+    run_parser.add_argument('--latency-calls', type=int, default=2000, help='single-row calls per model')
+    run_parser.add_argument('--throughput-seconds', type=float, default=1.0, help='time spent per batch size')
+
+    compare_parser = commands.add_parser('compare', help='flag regressions against a baseline report')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help='relative change counted as a regression (default: 0.25)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run(args.diseases, args.repeat, args.latency_calls, args.throughput_seconds,
+                     log=lambda message: print(f"benchmarking {message}...", file=sys.stderr))
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                file.write(text + '\n')
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(args.current, encoding='utf-8') as file:
+        current = json.load(file)
+    regressions, improvements = compare(baseline, current, args.threshold)
+    for title, rows in (('Regressions', regressions), ('Improvements', improvements)):
+        if rows:
+            print(f"{title} (threshold {args.threshold:.0%}):")
+            for metric, before, after, change in rows:
+                if before is None:
+                    print(f"  {metric}: {after}")
+                elif after is None:
+                    print(f"  {metric}: {before:.6g} -> missing")
+                else:
+                    print(f"  {metric}: {before:.6g} -> {after:.6g} ({change:+.1%})")
+    if not regressions:
+        print('No regressions.')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+"""Bounded LRU/TTL memoization of per-row predictions.
+
+Keys are ``(disease, model generation, canonical row bytes)``: the row is cast to
+contiguous float64 with ``-0.0`` folded into ``0.0``, so the same inputs typed as
+``"1"``, ``1`` or ``1.0`` share an entry.  Including the registry generation
+means a reloaded model can never serve a stale result, and ``invalidate`` frees
+the old entries as soon as the registry reports the reload.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def row_keys(name, generation, X):
+    """Canonical, hashable keys for every row of ``X``."""
+    X = np.ascontiguousarray(X, dtype=np.float64) + 0.0  # -0.0 + 0.0 == +0.0
+    return [(name, generation, row.tobytes()) for row in X]
+
+
+class PredictionCache:
+
+    def __init__(self, max_entries=4096, ttl=600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_many(self, keys):
+        """Return a list with the cached value or None for each key."""
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for key in keys:
+                item = self._data.get(key)
+                if item is not None and item[1] < now:
+                    del self._data[key]
+                    self.expirations += 1
+                    item = None
+                if item is None:
+                    self.misses += 1
+                    found.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    found.append(item[0])
+        return found
+
+    def put_many(self, items):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._data[key] = (value, expires)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, name=None):
+        """Drop every entry, or only those of one disease."""
+        with self._lock:
+            if name is None:
+                self._data.clear()
+            else:
+                for key in [key for key in self._data if key[0] == name]:
+                    del self._data[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._data),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+def cached_predict(cache, name, generation, classes, X, compute):
+    """Score ``X`` through ``cache``; ``compute`` scores the rows that miss.
+
+    ``compute`` takes and returns the same shapes as ``mdp.service.score``.
+    """
+    keys = row_keys(name, generation, X)
+    found = cache.get_many(keys)
+    missing = [i for i, value in enumerate(found) if value is None]
+    if missing:
+        labels, proba = compute(np.asarray(X)[missing])
+        fresh = [(labels[k].item() if hasattr(labels[k], 'item') else labels[k],
+                  None if proba is None else float(proba[k])) for k in range(len(missing))]
+        cache.put_many((keys[i], value) for i, value in zip(missing, fresh))
+        for i, value in zip(missing, fresh):
+            found[i] = value
+    labels = np.array([value[0] for value in found], dtype=np.asarray(classes).dtype)
+    if found and found[0][1] is None:
+        return labels, None
+    return labels, np.array([value[1] for value in found], dtype=np.float64)
@@ -0,0 +1,285 @@
+"""Shrink compiled forests and report the accuracy/size/latency trade-off.
+
+Every transformation works on a ``CompiledForest`` and returns a new one:
+
+* ``select_trees``  -- keep the first ``n`` trees (their order is the fitting order);
+* ``prune_depth``   -- turn every node at ``depth`` into a leaf holding the class
+  distribution of the samples that reached it;
+* ``merge_leaves``  -- collapse a split whose two leaves predict the same
+  distribution (within ``tolerance``; 0 keeps predictions identical);
+* ``compact``       -- float32 thresholds and int16 features/children.  Rows are
+  already compared in float32, and each threshold is rounded *down* to the
+  nearest float32, so every row still takes the same branch.
+
+``python -m mdp.compress cancer`` evaluates a grid of variants on the notebook's
+held-out split and prints test accuracy, agreement with the original model,
+package size and latency side by side.  With a single ``--trees`` / ``--depths``
+choice, ``--write`` saves that variant as the model's ``mdp.package``, which the
+registry then serves in place of the full forest.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from mdp import datasets, package
+from mdp.forest import CompiledForest, measure_depth
+
+INT16_MAX = np.iinfo(np.int16).max
+
+
+# --- Per-tree helpers ---
+def _split(model):
+    """Yield each tree's arrays with node indices local to the tree."""
+    bounds = list(model.offsets) + [model.n_nodes]
+    for start, stop in zip(bounds, bounds[1:]):
+        yield {name: getattr(model, name)[start:stop] for name in ('feature', 'threshold', 'left', 'right', 'value')}
+
+
+def _join(model, trees):
+    offsets = np.cumsum([0] + [len(tree['feature']) for tree in trees[:-1]]).astype(np.int64)
+    return CompiledForest(
+        feature=np.concatenate([tree['feature'] for tree in trees]),
+        threshold=np.concatenate([tree['threshold'] for tree in trees]),
+        left=np.concatenate([tree['left'] for tree in trees]),
+        right=np.concatenate([tree['right'] for tree in trees]),
+        value=np.ascontiguousarray(np.concatenate([tree['value'] for tree in trees])),
+        offsets=offsets,
+        classes=model.classes_,
+        n_features_in=model.n_features_in_,
+        feature_names_in=getattr(model, 'feature_names_in_', None),
+    )
+
+
+def _preorder(tree):
+    order, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if tree['left'][node] != node:
+            stack.extend((tree['right'][node], tree['left'][node]))
+    return order
+
+
+def _rebuild(tree, leaves):
+    """Keep the nodes reachable from the root once ``leaves`` (a bool mask) stop descending."""
+    order, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        if not leaves[node]:
+            stack.extend((tree['right'][node], tree['left'][node]))
+    order = np.asarray(order)
+    index = np.empty(len(leaves), dtype=np.int64)
+    index[order] = np.arange(len(order))
+    is_leaf = leaves[order]
+    own = np.arange(len(order), dtype=tree['left'].dtype)
+    left = np.where(is_leaf, own, index[tree['left'][order]]).astype(tree['left'].dtype)
+    right = np.where(is_leaf, own, index[tree['right'][order]]).astype(tree['right'].dtype)
+    return {
+        'feature': np.where(is_leaf, 0, tree['feature'][order]).astype(tree['feature'].dtype),
+        'threshold': np.where(is_leaf, 0, tree['threshold'][order]).astype(tree['threshold'].dtype),
+        'left': left,
+        'right': right,
+        'value': tree['value'][order],
+    }
+
+
+def _is_leaf(tree):
+    return tree['left'] == np.arange(len(tree['left']))
+
+
+# --- Transformations ---
+def select_trees(model, n_trees):
+    trees = list(_split(model))[:n_trees]
+    return _join(model, trees)
+
+
+def prune_depth(model, depth):
+    pruned = []
+    for tree in _split(model):
+        depths = np.zeros(len(tree['left']), dtype=np.int64)
+        for node in _preorder(tree):
+            if tree['left'][node] != node:
+                depths[tree['left'][node]] = depths[tree['right'][node]] = depths[node] + 1
+        pruned.append(_rebuild(tree, _is_leaf(tree) | (depths >= depth)))
+    return _join(model, pruned)
+
+
+def merge_leaves(model, tolerance=0.0):
+    merged = []
+    for tree in _split(model):
+        leaves = _is_leaf(tree)
+        value = tree['value'].copy()
+        # Children come after their parent in preorder, so walking it backwards merges bottom-up.
+        for node in reversed(_preorder(tree)):
+            left, right = tree['left'][node], tree['right'][node]
+            if leaves[node] or not (leaves[left] and leaves[right]):
+                continue
+            if np.abs(value[left] - value[right]).max() <= tolerance:
+                leaves[node] = True
+                if tolerance == 0:
+                    value[node] = value[left]  # keep the exact leaf values
+        merged.append(_rebuild(dict(tree, value=value), leaves))
+    return _join(model, merged)
+
+
+def compact(model):
+    """Store thresholds as float32 and features/children as int16 where they fit."""
+    threshold = model.threshold.astype(np.float32)
+    # Round down so that x <= t and x <= float32(t) agree for every float32 x.
+    above = threshold.astype(np.float64) > model.threshold
+    threshold[above] = np.nextafter(threshold[above], np.float32(-np.inf))
+    local = max(int(model.left.max(initial=0)), int(model.right.max(initial=0)))
+    index_dtype = np.int16 if local <= INT16_MAX else model.left.dtype
+    feature_dtype = np.int16 if model.n_features_in_ <= INT16_MAX else model.feature.dtype
+    return CompiledForest(
+        feature=model.feature.astype(feature_dtype),
+        threshold=threshold,
+        left=model.left.astype(index_dtype),
+        right=model.right.astype(index_dtype),
+        value=model.value,
+        offsets=model.offsets,
+        classes=model.classes_,
+        n_features_in=model.n_features_in_,
+        feature_names_in=getattr(model, 'feature_names_in_', None),
+        max_depth=model.max_depth,
+    )
+
+
+def shrink(model, n_trees=None, depth=None, tolerance=0.0):
+    """Apply the lossy choices given, then the lossless leaf merge and compaction."""
+    if n_trees is not None and n_trees < model.n_estimators:
+        model = select_trees(model, n_trees)
+    if depth is not None and depth < model.max_depth:
+        model = prune_depth(model, depth)
+    return compact(merge_leaves(model, tolerance))
+
+
+# --- Evaluation ---
+def package_bytes(model):
+    """Size on disk of ``model`` saved as an ``mdp.package``."""
+    directory = tempfile.mkdtemp()
+    try:
+        path = package.save(model, os.path.join(directory, 'model' + package.PACKAGE_SUFFIX))
+        return sum(entry.stat().st_size for entry in os.scandir(path))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def evaluate(model, reference, X_test, y_test, calls=300):
+    proba = model.predict_proba(X_test)
+    labels = model.classes_.take(np.argmax(proba, axis=1))
+    reference_proba = reference.predict_proba(X_test)
+    reference_labels = reference.classes_.take(np.argmax(reference_proba, axis=1))
+
+    timings = []
+    for i in range(calls):
+        row = X_test[i % len(X_test)][None, :]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    batch = np.resize(X_test, (4096, X_test.shape[1]))
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        'trees': model.n_estimators,
+        'nodes': model.n_nodes,
+        # Measured on the nodes: max_depth may be carried over from the forest this one was cut from.
+        'max_depth': measure_depth(model.left, model.right, model.offsets),
+        'package_bytes': package_bytes(model),
+        'accuracy': float((labels == y_test).mean()),
+        'agreement': float((labels == reference_labels).mean()),
+        'max_proba_change': float(np.abs(proba - reference_proba).max()),
+        'p50_us': float(np.median(timings) * 1e6),
+        'rows_per_second': len(batch) / batch_seconds,
+    }
+
+
+def report(name, model, trees, depths, tolerance=0.0):
+    """Evaluate the original forest and every (trees, depth) variant on the held-out split."""
+    _, X_test, _, y_test = datasets.train_test_split(name)
+    X_test, y_test = X_test.to_numpy(dtype=np.float64), y_test.to_numpy()
+    rows = [dict(variant='original', **evaluate(model, model, X_test, y_test))]
+    for n_trees in trees:
+        for depth in depths:
+            variant = shrink(model, n_trees, depth, tolerance)
+            row = evaluate(variant, model, X_test, y_test)
+            label = ('lossless' if n_trees is None and depth is None and tolerance == 0 else
+                     f"trees={row['trees']} depth={row['max_depth']}")
+            rows.append(dict(variant=label, **row))
+    return rows
+
+
+def format_report(rows):
+    lines = [f"{'variant':<22}{'trees':>6}{'nodes':>7}{'depth':>6}{'KiB':>8}{'acc':>7}"
+             f"{'agree':>7}{'max dp':>8}{'p50 us':>8}{'rows/s':>10}"]
+    for row in rows:
+        lines.append(f"{row['variant']:<22}{row['trees']:>6}{row['nodes']:>7}{row['max_depth']:>6}"
+                     f"{row['package_bytes'] / 1024:>8.1f}{row['accuracy']:>7.3f}{row['agreement']:>7.3f}"
+                     f"{row['max_proba_change']:>8.3f}{row['p50_us']:>8.0f}{row['rows_per_second']:>10.0f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    import pickle
+
+    from mdp import forest, linear
+    from mdp.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Compress a forest model and compare the variants.')
+    parser.add_argument('disease', choices=['parkinsons', 'cancer', 'liver', 'kidney'])
+    parser.add_argument('--trees', type=int, nargs='*', default=None,
+                        help='tree counts to try (default: all, 50, 25, 10 where smaller than the forest)')
+    parser.add_argument('--depths', type=int, nargs='*', default=None,
+                        help='depth limits to try (default: none, 12, 8, 6 where shallower than the forest)')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='merge sibling leaves whose probabilities differ by at most this (default: 0)')
+    parser.add_argument('--json', help='also write the report to this JSON file')
+    parser.add_argument('--write', action='store_true',
+                        help="save the single chosen variant as the model's package")
+    args = parser.parse_args(argv)
+
+    # Always start from the full forest in the .sav, not from a package that may already be compressed.
+    model_path = ModelRegistry().path_for(args.disease)
+    with open(model_path, 'rb') as file:
+        model = pickle.load(file)
+    if not forest.is_forest(model):
+        parser.error(f"the {args.disease} model is not a forest")
+    model = forest.compile_forest(model)
+    trees = args.trees or [None] + [n for n in (50, 25, 10) if n < model.n_estimators]
+    depths = args.depths or [None] + [d for d in (12, 8, 6) if d < model.max_depth]
+
+    if args.write:
+        if len(trees) != 1 or len(depths) != 1:
+            parser.error('--write needs exactly one --trees and one --depths value')
+        previous = package.read_manifest(package.package_path(model_path)) \
+            if os.path.exists(package.manifest_path(model_path)) else {}
+        variant = shrink(model, trees[0], depths[0], args.tolerance)
+        path = package.save(variant, package.package_path(model_path),
+                            source_sha256=linear.file_sha256(model_path),
+                            sklearn_version=previous.get('sklearn_version'),
+                            data_sha256=previous.get('data_sha256'),
+                            compression={'trees': trees[0], 'depth': depths[0], 'tolerance': args.tolerance})
+        print(f"{args.disease}: wrote {path} ({variant.n_estimators} trees, {variant.n_nodes} nodes)",
+              file=sys.stderr)
+        return 0
+
+    rows = report(args.disease, model, trees, depths, args.tolerance)
+    print(format_report(rows))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(rows, file, indent=2)
+            file.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""Readers for ``dataset/*.csv`` that reproduce the notebooks' preprocessing.
+
+``prepare`` turns a frame in the raw CSV layout into the feature matrix each
+saved model was trained on, with the encodings declared in ``mdp.schema``.  Values that cannot be parsed (kidney's blank cells,
+stray tabs, misplaced strings) become NaN so callers can decide whether to drop
+or report those rows.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from mdp.diseases import DATASET_DIR, get_disease
+from mdp.schema import CATEGORY, FLOAT, SCHEMAS
+
+# --- Model feature order, as produced by Trained_model/*.ipynb ---
+FEATURES = {name: schema.names for name, schema in SCHEMAS.items()}
+
+TARGETS = {
+    'diabetes': 'Outcome',
+    'heart': 'target',
+    'parkinsons': 'status',
+    'cancer': 'diagnosis',
+    'liver': 'Dataset',
+    'kidney': 'classification',
+}
+
+# Columns identifying a record rather than describing it.
+ID_COLUMNS = {'parkinsons': 'name', 'cancer': 'id', 'kidney': 'id'}
+
+# Train/test splits used by the notebooks.
+SPLITS = {
+    'diabetes': dict(test_size=0.2, random_state=2, stratify=True),
+    'heart': dict(test_size=0.2, random_state=2, stratify=True),
+    'parkinsons': dict(test_size=0.2, random_state=2, stratify=False),
+    'cancer': dict(test_size=0.2, random_state=42, stratify=False),
+    'liver': dict(test_size=0.1, random_state=42, stratify=False),
+    'kidney': dict(test_size=0.2, random_state=42, stratify=False),
+}
+
+KIDNEY_CATEGORIES = {f.name: f.categories for f in SCHEMAS['kidney'].fields if f.kind == CATEGORY}
+
+# Fill value the liver notebook used for the four missing ratios.
+LIVER_RATIO_FILL = SCHEMAS['liver'].field('Albumin_and_Globulin_Ratio').missing
+
+
+def dataset_path(name):
+    return os.path.join(DATASET_DIR, get_disease(name).dataset_file)
+
+
+def read_csv(name, path=None, **kwargs):
+    """Read a CSV in the layout of ``dataset/<name>.csv``; extra kwargs go to pandas."""
+    # heart.csv starts with a byte order mark.
+    kwargs.setdefault('encoding', 'utf-8-sig')
+    return pd.read_csv(path or dataset_path(name), **kwargs)
+
+
+def _numeric(column):
+    values = pd.to_numeric(column, errors='coerce')
+    if column.dtype == object:
+        # Only pay for strip() on the few cells with stray tabs or spaces.
+        retry = values.isna() & column.notna()
+        if retry.any():
+            values[retry] = pd.to_numeric(column[retry].str.strip(), errors='coerce')
+    return values
+
+
+def _encode(column, mapping):
+    return column.astype(str).str.strip().map(mapping).astype(float)
+
+
+def prepare(name, frame):
+    """Return ``(X, y)`` for a raw frame; ``y`` is None when the target column is absent."""
+    frame = frame.copy()
+    target = TARGETS[name]
+    y = None
+
+    if name == 'cancer' and target in frame:
+        y = frame[target].map({'M': 1, 'B': 0})
+    elif name == 'liver':
+        if 'Gender' in frame:
+            frame['Gender_Male'] = (frame['Gender'].astype(str).str.strip() == 'Male').astype(float)
+            frame.loc[frame['Gender'].isna(), 'Gender_Male'] = np.nan
+        if 'Albumin_and_Globulin_Ratio' in frame:
+            frame['Albumin_and_Globulin_Ratio'] = frame['Albumin_and_Globulin_Ratio'].fillna(LIVER_RATIO_FILL)
+        if target in frame:
+            y = frame[target].replace({2: 1, 1: 0})
+    elif name == 'kidney':
+        for column, mapping in KIDNEY_CATEGORIES.items():
+            if column in frame:
+                frame[column] = _encode(frame[column], mapping)
+        if target in frame:
+            y = _encode(frame[target], {'ckd': 1, 'notckd': 0})
+    elif target in frame:
+        y = frame[target]
+
+    features = FEATURES[name]
+    missing = [column for column in features if column not in frame]
+    if missing:
+        raise ValueError(f"Input for '{name}' is missing columns: {', '.join(missing)}")
+    X = pd.DataFrame({column: _numeric(frame[column]) for column in features}, index=frame.index)
+    return X, y
+
+
+def load(name):
+    """Load the complete, labelled rows of a dataset as the notebooks did."""
+    frame = read_csv(name)
+    if name == 'kidney':
+        # The notebook drops every row with any blank cell, not just blank features.
+        frame = frame.dropna(axis=0)
+    X, y = prepare(name, frame)
+    keep = X.notna().all(axis=1) & y.notna()
+    return X[keep], y[keep].astype(int)
+
+
+def fill_values(name):
+    """Stand-ins for blank cells, taken from the rows ``load`` returns.
+
+    Measurements get their mean; whole-number and categorical features their
+    most common value, so that every stand-in is a value the model has seen.
+    """
+    X, _ = load(name)
+    return {f.name: float(X[f.name].mean() if f.kind == FLOAT else X[f.name].mode().iloc[0])
+            for f in SCHEMAS[name].fields}
+
+
+def train_test_split(name):
+    """Reproduce the notebook's train/test split for ``name``."""
+    from sklearn.model_selection import train_test_split as split
+
+    X, y = load(name)
+    params = dict(SPLITS[name])
+    stratify = y if params.pop('stratify') else None
+    return split(X, y, stratify=stratify, **params)
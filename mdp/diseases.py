@@ -0,0 +1,58 @@
+"""Catalog of the diseases served by the app and the files backing them."""
+import os
+from dataclasses import dataclass
+
+# --- Repository layout ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAVED_MODELS_DIR = os.path.join(ROOT_DIR, 'saved_models')
+DATASET_DIR = os.path.join(ROOT_DIR, 'dataset')
+
+
+@dataclass(frozen=True)
+class Disease:
+    key: str           # short name used by the registry, CLIs and the API
+    page: str          # sidebar label in app.py
+    model_file: str    # file name inside saved_models/
+    dataset_file: str  # file name inside dataset/
+    title: str         # page heading
+    button: str        # label of the page's prediction button
+    positive: str      # result shown when the model predicts 1
+    negative: str      # result shown when the model predicts 0
+
+
+DISEASES = {d.key: d for d in (
+    Disease('diabetes', 'Diabetes Prediction', 'svm_diabetes_model.sav', 'diabetes.csv',
+            'Diabetes Prediction using ML', 'Diabetes Test Result',
+            'The person is diabetic', 'The person is not diabetic'),
+    Disease('heart', 'Heart Disease Prediction', 'heart_disease_model.sav', 'heart.csv',
+            'Heart Disease Prediction using ML', 'Heart Disease Test Result',
+            'The person is having heart disease', 'The person does not have any heart disease'),
+    Disease('parkinsons', 'Parkinsons Prediction', 'parkinsons_model.sav', 'parkinsons.csv',
+            "Parkinson's Disease Prediction using ML", "Parkinson's Test Result",
+            "The person has Parkinson's disease", "The person does not have Parkinson's disease"),
+    Disease('cancer', 'Cancer Prediction', 'cancer.sav', 'cancer.csv',
+            'Breast Cancer Prediction using ML', 'Cancer Test Result',
+            'The person is predicted to have Malignant Cancer.',
+            'The person is predicted to have Benign Cancer.'),
+    Disease('liver', 'Liver Disease Prediction', 'liver.sav', 'liver.csv',
+            'Liver Disease Prediction using ML', 'Liver Disease Test Result',
+            'The person is predicted to have Liver Disease.',
+            'The person is predicted not to have Liver Disease.'),
+    Disease('kidney', 'Kidney Disease Prediction', 'kidney.sav', 'kidney.csv',
+            'Kidney Disease Prediction using ML', 'Kidney Disease Test Result',
+            'The person is predicted to have Chronic Kidney Disease (CKD).',
+            'The person is predicted not to have Chronic Kidney Disease (CKD).'),
+)}
+
+
+def get_disease(key):
+    try:
+        return DISEASES[key]
+    except KeyError:
+        raise KeyError(f"Unknown disease '{key}'. Expected one of: {', '.join(DISEASES)}") from None
+
+
+def diagnosis(key, label):
+    """Human-readable result for a predicted label."""
+    disease = get_disease(key)
+    return disease.positive if label == 1 else disease.negative
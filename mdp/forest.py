@@ -0,0 +1,283 @@
+"""Flat-array NumPy inference for fitted random forests.
+
+``compile_forest`` copies every tree of a fitted ``RandomForestClassifier`` into
+a handful of contiguous arrays, one slot per node:
+
+* ``feature`` / ``threshold`` -- the split tested at the node,
+* ``left`` / ``right``        -- children as indices *local to the tree*; leaves
+  point at themselves so traversal needs no branching,
+* ``value``                   -- the node's normalized class distribution,
+* ``offsets``                 -- where each tree's nodes start.
+
+``CompiledForest`` finds the leaves in one of two ways, both over those arrays:
+
+* few rows -- walk all rows through all trees at once, one level per NumPy
+  step.  Every level gathers over every (row, tree) pair, so the cost grows
+  with rows x trees x depth;
+* large batches -- split the batch down each tree, node by node: each split
+  node compares its rows' column against its threshold and hands the two
+  halves to its children.  That costs a few NumPy calls per node, whatever the
+  batch size, so it takes over once the walk would make ``PARTITION_RATIO``
+  times more gathers than the forest has nodes.
+
+Either way rows are compared in float32 against the float64 thresholds and
+tree probabilities are summed in estimator order, exactly as sklearn does, so
+predictions are bit-identical (see ``python -m mdp.forest``).
+"""
+import numpy as np
+
+FOREST_TYPES = ('RandomForestClassifier', 'ExtraTreesClassifier')
+
+# Rows scored per traversal step; bounds the (rows x trees) index buffers.
+CHUNK_ROWS = 4096
+
+# Gathers of the level walk per node of the forest from which batches are split node by node.
+PARTITION_RATIO = 400
+
+
+def is_forest(model):
+    return type(model).__name__ in FOREST_TYPES and getattr(model, 'n_outputs_', 1) == 1
+
+
+class CompiledForest:
+    """Drop-in ``predict`` / ``predict_proba`` for a single-output forest classifier."""
+
+    def __init__(self, feature, threshold, left, right, value, offsets, classes,
+                 n_features_in, feature_names_in=None, max_depth=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.offsets = offsets
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features_in)
+        if feature_names_in is not None:
+            self.feature_names_in_ = feature_names_in
+        self.max_depth = int(max_depth) if max_depth is not None else measure_depth(left, right, offsets)
+
+    @property
+    def n_estimators(self):
+        return len(self.offsets)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def predict(self, X):
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+    def predict_proba(self, X):
+        X = self._validate(X)
+        if self._partitions(X.shape[0]):
+            out = np.zeros((X.shape[0], self.value.shape[1]), dtype=np.float64)
+            # Tree by tree, in estimator order, without materializing the (rows, trees) leaves.
+            for leaves in self._partition(X):
+                out += self.value.take(leaves, axis=0)
+            out /= self.n_estimators
+            return out
+        out = np.empty((X.shape[0], self.value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            leaves = self.apply(X[start:stop], validate=False)
+            # cumsum adds the trees left to right, the order sklearn accumulates them in.
+            out[start:stop] = np.cumsum(self.value[leaves], axis=1)[:, -1]
+        out /= self.n_estimators
+        return out
+
+    def apply(self, X, validate=True):
+        """Return the global index of the leaf reached in every tree, shape (rows, trees)."""
+        if validate:
+            X = self._validate(X)
+        if self._partitions(X.shape[0]):
+            leaves = np.empty((self.n_estimators, X.shape[0]), dtype=np.intp)
+            for i, tree_leaves in enumerate(self._partition(X)):
+                leaves[i] = tree_leaves
+            return leaves.T
+        offsets = self.offsets
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(offsets, (X.shape[0], len(offsets)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node]) + offsets
+        return node
+
+    def _partitions(self, n_rows):
+        return n_rows * self.n_estimators * self.max_depth >= PARTITION_RATIO * self.n_nodes
+
+    def _partition(self, X):
+        """Yield the global leaf index of every row, one tree at a time, in estimator order."""
+        # float64 columns: a Python float threshold would otherwise be rounded to float32.
+        columns = list(np.ascontiguousarray(X.T, dtype=np.float64))
+        feature, threshold = self.feature.tolist(), self.threshold.tolist()
+        left, right = self.left.tolist(), self.right.tolist()
+        all_rows = np.arange(X.shape[0])
+        for start in self.offsets.tolist():
+            leaves = np.empty(X.shape[0], dtype=np.intp)
+            stack = [(start, all_rows)]
+            while stack:
+                node, rows = stack.pop()
+                child = left[node] + start
+                if child == node:
+                    leaves[rows] = node
+                    continue
+                go_left = columns[feature[node]].take(rows) <= threshold[node]
+                rows_left = rows.compress(go_left)
+                # Subtrees no row reaches are never visited, so small batches stay cheap.
+                if len(rows_left):
+                    stack.append((child, rows_left))
+                if len(rows_left) < len(rows):
+                    stack.append((right[node] + start, rows.compress(~go_left)))
+            yield leaves
+
+    def _validate(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2D array of rows, got {X.ndim} dimensions.")
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model is expecting "
+                             f"{self.n_features_in_} features as input.")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN, infinity or a value too large for dtype('float32').")
+        return X
+
+
+def compile_forest(model):
+    """Pack the trees of a fitted forest into a ``CompiledForest``."""
+    if not is_forest(model):
+        raise TypeError(f"Cannot compile {type(model).__name__}; expected one of {', '.join(FOREST_TYPES)}.")
+    n_classes = len(model.classes_)
+    features, thresholds, lefts, rights, values, offsets = [], [], [], [], [], []
+    total = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        count = tree.node_count
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        is_leaf = left == -1
+        own = np.arange(count, dtype=np.int32)
+        left[is_leaf] = own[is_leaf]
+        right[is_leaf] = own[is_leaf]
+
+        feature = tree.feature.astype(np.int32)
+        feature[is_leaf] = 0
+        threshold = tree.threshold.astype(np.float64)
+        threshold[is_leaf] = 0.0
+
+        # Same normalization as DecisionTreeClassifier.predict_proba.
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        value /= normalizer
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(value)
+        offsets.append(total)
+        total += count
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        value=np.ascontiguousarray(np.concatenate(values)),
+        offsets=np.asarray(offsets, dtype=np.int64),
+        classes=np.asarray(model.classes_),
+        n_features_in=model.n_features_in_,
+        feature_names_in=getattr(model, 'feature_names_in_', None),
+        max_depth=max(estimator.tree_.max_depth for estimator in model.estimators_),
+    )
+
+
+def measure_depth(left, right, offsets):
+    """Depth of the deepest tree, recovered from the child arrays."""
+    depth = 0
+    frontier = np.asarray(offsets, dtype=np.int64)
+    tree_start = frontier.copy()
+    while True:
+        children = np.concatenate([left[frontier] + tree_start, right[frontier] + tree_start])
+        owners = np.concatenate([tree_start, tree_start])
+        moved = children != np.concatenate([frontier, frontier])
+        if not moved.any():
+            return depth
+        frontier, tree_start = children[moved], owners[moved]
+        depth += 1
+
+
+# --- Verification against sklearn ---
+def verify(model, X):
+    """Return the number of rows whose compiled predictions differ from sklearn's."""
+    compiled = compile_forest(model)
+    X = np.asarray(X, dtype=np.float64)
+    expected_proba = model.predict_proba(X)
+    actual_proba = compiled.predict_proba(X)
+    mismatched = ~(expected_proba == actual_proba).all(axis=1)
+    mismatched |= model.predict(X) != compiled.predict(X)
+    return int(mismatched.sum())
+
+
+def main(argv=None):
+    import argparse
+    import pickle
+    import time
+    import warnings
+
+    from mdp import datasets
+    from mdp.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Check compiled forests against sklearn on dataset/*.csv.')
+    parser.add_argument('diseases', nargs='*', default=['parkinsons', 'cancer', 'liver', 'kidney'])
+    args = parser.parse_args(argv)
+    # Rows are scored as arrays, which the forests fitted on frames warn about once per call.
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    registry = ModelRegistry()
+    failed = False
+    for name in args.diseases:
+        # The pickle itself: the registry would hand back the already compiled package.
+        with open(registry.path_for(name), 'rb') as file:
+            model = pickle.load(file)
+        if not is_forest(model):
+            print(f"{name}: {type(model).__name__} is not a forest, nothing to check")
+            failed = True
+            continue
+        model.set_params(n_jobs=1)  # threaded accumulation makes sklearn's own sums order-dependent
+        X, _ = datasets.prepare(name, datasets.read_csv(name))
+        X = X[X.notna().all(axis=1)].to_numpy()
+        mismatches = verify(model, X)
+        failed |= mismatches > 0
+
+        compiled = compile_forest(model)
+        row = X[:1]
+        start = time.perf_counter()
+        for _ in range(200):
+            model.predict(row)
+        sklearn_ms = (time.perf_counter() - start) / 200 * 1000
+        start = time.perf_counter()
+        for _ in range(200):
+            compiled.predict(row)
+        compiled_ms = (time.perf_counter() - start) / 200 * 1000
+
+        batch = np.resize(X, (CHUNK_ROWS, X.shape[1]))
+        batch_mismatches = int((model.predict_proba(batch) != compiled.predict_proba(batch)).any(axis=1).sum())
+        failed |= batch_mismatches > 0
+        start = time.perf_counter()
+        model.predict_proba(batch)
+        sklearn_batch_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        compiled.predict_proba(batch)
+        compiled_batch_ms = (time.perf_counter() - start) * 1000
+        print(f"{name}: {len(X)} rows, {mismatches + batch_mismatches} mismatches; single row "
+              f"{sklearn_ms:.3f} ms sklearn vs {compiled_ms:.3f} ms compiled; {len(batch)} rows "
+              f"{sklearn_batch_ms:.1f} ms sklearn vs {compiled_batch_ms:.1f} ms compiled")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,177 @@
+"""sklearn-free inference for the linear diabetes and heart models.
+
+Scoring a linear model is one dot product, yet unpickling it imports all of
+sklearn.  ``export`` pulls ``coef_``, ``intercept_`` and ``classes_`` into a small
+JSON artifact next to the ``.sav`` file, and ``LinearModel`` scores it with NumPy
+alone.  The artifact records the SHA-256 of the pickle it came from so the
+registry can ignore it once the ``.sav`` file is retrained.
+
+    python -m mdp.linear export     # write saved_models/*.linear.json
+    python -m mdp.linear verify     # compare against the pickled models
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+FORMAT = 'mdp-linear'
+FORMAT_VERSION = 1
+ARTIFACT_SUFFIX = '.linear.json'
+
+LINEAR_TYPES = {'SVC': 'svc', 'LinearSVC': 'svc', 'LogisticRegression': 'logistic'}
+
+
+def is_linear(model):
+    if type(model).__name__ not in LINEAR_TYPES or len(getattr(model, 'classes_', ())) != 2:
+        return False
+    return getattr(model, 'kernel', 'linear') == 'linear'
+
+
+def artifact_path(model_path):
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LinearModel:
+    """Binary linear classifier scored with a single matrix product."""
+
+    def __init__(self, coef, intercept, classes, kind, feature_names_in=None, source_sha256=None):
+        self.coef_ = np.asarray(coef, dtype=np.float64).reshape(1, -1)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64).reshape(1)
+        self.classes_ = np.asarray(classes)
+        self.kind = kind
+        self.n_features_in_ = self.coef_.shape[1]
+        if feature_names_in is not None:
+            self.feature_names_in_ = np.asarray(feature_names_in, dtype=object)
+        self.source_sha256 = source_sha256
+
+    def decision_function(self, X):
+        X = self._validate(X)
+        return (X @ self.coef_.T + self.intercept_).ravel()
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    @property
+    def predict_proba(self):
+        # Mirrors sklearn: SVC without probability=True has no predict_proba at all.
+        if self.kind != 'logistic':
+            raise AttributeError(f"predict_proba is not available for the '{self.kind}' model.")
+        return self._predict_proba
+
+    def _predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def _validate(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2:
+            raise ValueError(f"Expected a 2D array of rows, got {X.ndim} dimensions.")
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model is expecting "
+                             f"{self.n_features_in_} features as input.")
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity.")
+        return X
+
+    def to_dict(self):
+        return {
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'kind': self.kind,
+            'classes': self.classes_.tolist(),
+            'coef': self.coef_.ravel().tolist(),
+            'intercept': float(self.intercept_[0]),
+            'feature_names': (self.feature_names_in_.tolist()
+                              if hasattr(self, 'feature_names_in_') else None),
+            'source_sha256': self.source_sha256,
+        }
+
+
+def from_sklearn(model, source_sha256=None):
+    if not is_linear(model):
+        raise TypeError(f"Cannot export {type(model).__name__}; expected a binary linear "
+                        f"{' / '.join(LINEAR_TYPES)}.")
+    return LinearModel(model.coef_, model.intercept_, model.classes_, LINEAR_TYPES[type(model).__name__],
+                       feature_names_in=getattr(model, 'feature_names_in_', None),
+                       source_sha256=source_sha256)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if data.get('format') != FORMAT or data.get('version') != FORMAT_VERSION:
+        raise ValueError(f"'{path}' is not a version {FORMAT_VERSION} {FORMAT} artifact.")
+    return LinearModel(data['coef'], data['intercept'], data['classes'], data['kind'],
+                       feature_names_in=data.get('feature_names'),
+                       source_sha256=data.get('source_sha256'))
+
+
+def save(linear_model, path, sklearn_version=None):
+    data = linear_model.to_dict()
+    data['sklearn_version'] = sklearn_version
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2)
+        file.write('\n')
+    os.replace(tmp_path, path)
+
+
+def export(model_path):
+    """Write the artifact for the pickled linear model at ``model_path``."""
+    import pickle
+
+    import sklearn
+
+    with open(model_path, 'rb') as file:
+        model = pickle.load(file)
+    path = artifact_path(model_path)
+    save(from_sklearn(model, source_sha256=file_sha256(model_path)), path,
+         sklearn_version=sklearn.__version__)
+    return path
+
+
+def main(argv=None):
+    import argparse
+    import pickle
+
+    from mdp import datasets
+    from mdp.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Export or verify the NumPy linear model artifacts.')
+    parser.add_argument('command', choices=['export', 'verify'])
+    parser.add_argument('diseases', nargs='*', default=['diabetes', 'heart'])
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry()
+    failed = False
+    for name in args.diseases:
+        model_path = registry.path_for(name)
+        if args.command == 'export':
+            print(f"{name}: wrote {export(model_path)}")
+            continue
+        with open(model_path, 'rb') as file:
+            model = pickle.load(file)
+        linear = load(artifact_path(model_path))
+        X, _ = datasets.prepare(name, datasets.read_csv(name))
+        X = X[X.notna().all(axis=1)].to_numpy()
+        mismatches = int((model.predict(X) != linear.predict(X)).sum())
+        drift = float(np.abs(model.decision_function(X) - linear.decision_function(X)).max())
+        failed |= mismatches > 0
+        print(f"{name}: {len(X)} rows, {mismatches} label mismatches, "
+              f"max decision difference {drift:.2e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+"""Low-overhead timing spans, error counters and an on-demand sampling profiler.
+
+Spans time the hot path per disease and feed one Prometheus histogram::
+
+    with metrics.span('predict', 'cancer'):
+        ...
+
+An exception leaving a span also counts in ``mdp_errors_total`` under its
+class name.  A span costs two ``perf_counter`` calls, a bisect and an
+uncontended lock (a couple of microseconds, against the hundreds a prediction
+takes), so it stays on in production.
+
+``render`` produces the Prometheus text format.  The API serves it at
+``GET /metrics``; the Streamlit app, which has no routes of its own, starts
+``start_http_server`` on ``MDP_METRICS_PORT`` when that variable is set.  Both
+also answer ``POST /profiler/start``, ``POST /profiler/stop`` and
+``GET /profiler``: a sampling profiler that walks every thread's stack at a
+fixed interval while it is on, and reports them in the collapsed-stack format
+read by flamegraph tools.  It costs nothing while off.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Upper bounds, in seconds, of the span histogram buckets.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _number(value):
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# --- Metric types ---
+class Counter:
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then the sum.
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Owns the metrics and the collectors that report other components' state on scrape."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def add_collector(self, key, collect):
+        """Register ``collect()``, returning ``[(name, type, help, [(labels dict, value)])]``.
+
+        Registering again under the same ``key`` replaces the previous collector.
+        """
+        with self._lock:
+            self._collectors[key] = collect
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collect in list(self._collectors.values()):
+            for name, kind, help, samples in collect():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+SPAN_SECONDS = REGISTRY.histogram('mdp_span_seconds', 'Time spent in each stage of the prediction flow.',
+                                  ('span', 'disease'))
+ERRORS = REGISTRY.counter('mdp_errors_total', 'Errors by stage, disease and exception type.',
+                          ('span', 'disease', 'type'))
+
+
+# --- Spans ---
+class span:
+    """Context manager timing one stage for one disease; see the module docstring."""
+
+    __slots__ = ('name', 'disease', 'start')
+
+    def __init__(self, name, disease=''):
+        self.name = name
+        self.disease = disease
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        SPAN_SECONDS.observe(time.perf_counter() - self.start, self.name, self.disease)
+        if exc_type is not None:
+            ERRORS.inc(self.name, self.disease, exc_type.__name__)
+        return False
+
+
+def record_error(name, disease, error_type):
+    """Count an error handled outside a span, e.g. a page's ``ValueError`` branch."""
+    ERRORS.inc(name, disease, error_type)
+
+
+def render():
+    return REGISTRY.render()
+
+
+def model_collector(registry, cache):
+    """Collector reporting a model registry and its prediction cache."""
+    def collect():
+        models = registry.stats()
+        stats = cache.stats()
+        return [
+            ('mdp_model_generation', 'gauge', 'Times each model has been loaded.',
+             [({'disease': info['name']}, info['generation']) for info in models]),
+            ('mdp_model_resident_bytes', 'gauge', 'Private memory held by each loaded model.',
+             [({'disease': info['name']}, info['resident_bytes']) for info in models]),
+            ('mdp_model_load_seconds', 'gauge', 'Duration of the last load of each model.',
+             [({'disease': info['name']}, info['load_seconds']) for info in models]),
+            ('mdp_cache_entries', 'gauge', 'Rows held by the prediction cache.', [({}, stats['entries'])]),
+            ('mdp_cache_hits_total', 'counter', 'Prediction cache hits.', [({}, stats['hits'])]),
+            ('mdp_cache_misses_total', 'counter', 'Prediction cache misses.', [({}, stats['misses'])]),
+            ('mdp_cache_evictions_total', 'counter', 'Rows evicted from the full prediction cache.',
+             [({}, stats['evictions'])]),
+        ]
+    return collect
+
+
+# --- Sampling profiler ---
+class SamplingProfiler:
+    """Samples the stacks of all other threads every ``interval`` seconds while running."""
+
+    def __init__(self, max_depth=64):
+        self.max_depth = max_depth
+        self.interval = None
+        self.samples = 0
+        self._stacks = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.005):
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = interval
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='mdp-profiler', daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._stacks = {}
+            self.samples = 0
+
+    def collapsed(self):
+        """``frame;frame;frame count`` lines, outermost frame first, most frequent stack first."""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        stacks.sort(key=lambda item: -item[1])
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            sampled = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                sampled.append(';'.join(reversed(names)))
+            # Frames are walked outside the lock; only the counts are shared with collapsed() and reset().
+            with self._lock:
+                for stack in sampled:
+                    self._stacks[stack] = self._stacks.get(stack, 0) + 1
+                self.samples += 1
+
+
+PROFILER = SamplingProfiler()
+
+
+# --- HTTP ---
+def respond(method, path):
+    """Answer a metrics or profiler route as ``(status, content_type, body)``, or None for other paths."""
+    url = urlsplit(path)
+    if method == 'GET' and url.path == '/metrics':
+        return 200, CONTENT_TYPE, render()
+    if url.path == '/profiler':
+        if method != 'GET':
+            return None
+        state = f"# running={PROFILER.running} interval={PROFILER.interval} samples={PROFILER.samples}\n"
+        return 200, 'text/plain; charset=utf-8', state + PROFILER.collapsed()
+    if method == 'POST' and url.path == '/profiler/start':
+        query = parse_qs(url.query)
+        try:
+            interval = float(query.get('interval_ms', ['5'])[0]) / 1000
+        except ValueError:
+            return 400, 'text/plain; charset=utf-8', 'interval_ms must be a number\n'
+        if not 0.0005 <= interval <= 1.0:
+            return 400, 'text/plain; charset=utf-8', 'interval_ms must be between 0.5 and 1000\n'
+        if 'reset' in query:
+            PROFILER.reset()
+        started = PROFILER.start(interval)
+        return 200, 'text/plain; charset=utf-8', 'started\n' if started else 'already running\n'
+    if method == 'POST' and url.path == '/profiler/stop':
+        return 200, 'text/plain; charset=utf-8', 'stopped\n' if PROFILER.stop() else 'not running\n'
+    return None
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self._answer('GET')
+
+    def do_POST(self):
+        self._answer('POST')
+
+    def _answer(self, method):
+        status, content_type, body = respond(method, self.path) or (
+            404, 'text/plain; charset=utf-8', f"No route for {method} {self.path}\n")
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_servers = {}
+_servers_guard = threading.Lock()
+
+
+def start_http_server(port, host='127.0.0.1'):
+    """Serve ``respond`` on a daemon thread; calling it again for the same port is a no-op."""
+    with _servers_guard:
+        if (host, port) not in _servers:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name='mdp-metrics', daemon=True).start()
+            _servers[host, port] = server
+        return _servers[host, port]
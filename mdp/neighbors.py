@@ -0,0 +1,249 @@
+"""k-nearest-neighbour lookup of similar labelled records in ``dataset/*.csv``.
+
+Each disease gets an index over the complete, labelled rows that
+``mdp.datasets.load`` returns, with every feature standardized by the dataset's
+mean and standard deviation so that no single unit dominates the distance.
+Indexes are persisted next to the models, in the layout of ``mdp.package``::
+
+    saved_models/cancer.neighbors/
+        manifest.json     feature order, scaler, dataset SHA-256
+        features.npy      raw feature values, for display
+        standardized.npy  the matrix the tree is built on
+        labels.npy  rows.npy  ids.npy
+
+``load`` memory-maps the arrays and builds a ``scipy.spatial.cKDTree`` over
+them, a few milliseconds for these datasets; a query for one row then takes
+tens of microseconds.  ``query`` and ``similar`` take a 2D array, so a batch of
+rows is answered in one vectorized call.
+
+``insert`` adds new labelled records without a rebuild: they go to a small
+buffer that queries scan by brute force alongside the tree, and the tree is
+rebuilt only once the buffer outgrows ``rebuild_fraction`` of it.  New records
+use the scaler of the original dataset, so existing distances never change.
+
+    python -m mdp.neighbors build     # write saved_models/*.neighbors from dataset/*.csv
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from mdp import datasets, linear, package
+from mdp.diseases import DISEASES, SAVED_MODELS_DIR, get_disease
+
+FORMAT = 'mdp-neighbors'
+FORMAT_VERSION = 1
+INDEX_SUFFIX = '.neighbors'
+MANIFEST_FILE = package.MANIFEST_FILE
+ARRAYS = ('features', 'standardized', 'labels', 'rows', 'ids')
+
+
+def index_path(name, model_dir=SAVED_MODELS_DIR):
+    return os.path.join(model_dir, os.path.splitext(get_disease(name).model_file)[0] + INDEX_SUFFIX)
+
+
+class NeighborIndex:
+    """Standardized feature matrix of one disease with a KD-tree and an insertion buffer.
+
+    ``rows`` is the record's row number in the CSV (-1 for inserted records)
+    and ``ids`` its id column, or the row number when the layout has none.
+    """
+
+    def __init__(self, name, features, labels, rows, ids, mean, scale, dataset_sha256=None,
+                 standardized=None, rebuild_fraction=0.1, min_rebuild=64):
+        from scipy.spatial import cKDTree
+
+        self._cKDTree = cKDTree
+        self.name = name
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.dataset_sha256 = dataset_sha256
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild = min_rebuild
+        self.features = np.asarray(features, dtype=np.float64)
+        self.standardized = self.standardize(self.features) if standardized is None else standardized
+        self.labels = np.asarray(labels)
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.ids = np.asarray(ids, dtype=str)
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        # (tree, number of records in the tree); records past that are the buffer.
+        self._state = (cKDTree(self.standardized), len(self.features))
+
+    @classmethod
+    def from_dataset(cls, name, **kwargs):
+        X, y = datasets.load(name)
+        id_column = datasets.ID_COLUMNS.get(name)
+        if id_column:
+            ids = datasets.read_csv(name, usecols=[id_column])[id_column].loc[X.index].astype(str)
+        else:
+            ids = X.index.astype(str)
+        features = X.to_numpy(dtype=np.float64)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0  # a constant feature contributes nothing either way
+        return cls(name, features, y.to_numpy(), X.index.to_numpy(), np.asarray(ids), features.mean(axis=0),
+                   scale, dataset_sha256=linear.file_sha256(datasets.dataset_path(name)), **kwargs)
+
+    def __len__(self):
+        return len(self.features)
+
+    @property
+    def buffered(self):
+        return len(self.features) - self._state[1]
+
+    def standardize(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    # --- Queries ---
+    def query(self, X, k=5):
+        """Return ``(distances, indices)`` of shape ``(n_rows, k)``, nearest first.
+
+        Distances are Euclidean in standardized units; indices refer to
+        ``features``, ``labels``, ``rows`` and ``ids``.
+        """
+        Z = self.standardize(np.atleast_2d(X))
+        tree, n_tree = self._state
+        standardized = self.standardized
+        k = min(k, len(standardized))
+        if k < 1:
+            return np.empty((len(Z), 0)), np.empty((len(Z), 0), dtype=np.int64)
+        distances, indices = tree.query(Z, k=min(k, n_tree))
+        distances = distances.reshape(len(Z), -1)
+        indices = indices.reshape(len(Z), -1)
+        if len(standardized) == n_tree:
+            return distances, indices
+
+        # Scan the records inserted since the last rebuild and merge them in.
+        buffered = standardized[n_tree:]
+        extra = np.sqrt(((Z[:, None, :] - buffered[None, :, :]) ** 2).sum(axis=2))
+        distances = np.concatenate([distances, extra], axis=1)
+        indices = np.concatenate([indices, np.broadcast_to(np.arange(n_tree, len(standardized)), extra.shape)],
+                                 axis=1)
+        order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+    def similar(self, X, k=5):
+        """For each row of ``X``, the ``k`` most similar records as dicts."""
+        distances, indices = self.query(X, k)
+        names = datasets.FEATURES[self.name]
+        return [
+            [{'id': str(self.ids[i]), 'row': int(self.rows[i]), 'label': self.labels[i].item(),
+              'distance': float(distance), 'features': dict(zip(names, self.features[i].tolist()))}
+             for distance, i in zip(row_distances, row_indices)]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
+
+    # --- Insertion ---
+    def insert(self, X, labels, ids=None):
+        """Add labelled records; the tree is only rebuilt once the buffer is large enough."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        labels = np.asarray(labels).reshape(-1)
+        if X.shape[1] != self.features.shape[1] or len(labels) != len(X):
+            raise ValueError(f"Expected rows of {self.features.shape[1]} features with one label each, "
+                             f"got {X.shape} and {len(labels)} labels.")
+        ids = np.asarray([''] * len(X) if ids is None else ids, dtype=str)
+        with self._lock:
+            # New arrays rather than in-place growth, so concurrent queries see a consistent snapshot.
+            features = np.concatenate([self.features, X])
+            standardized = np.concatenate([self.standardized, self.standardize(X)])
+            self.labels = np.concatenate([self.labels, labels.astype(self.labels.dtype)])
+            self.rows = np.concatenate([self.rows, np.full(len(X), -1, dtype=np.int64)])
+            self.ids = np.concatenate([self.ids, ids])
+            self.features = features
+            self.standardized = standardized
+            tree, n_tree = self._state
+            if len(features) - n_tree > max(self.min_rebuild, self.rebuild_fraction * n_tree):
+                self._state = (self._cKDTree(standardized), len(features))
+                self.rebuilds += 1
+
+    # --- Persistence ---
+    def save(self, path):
+        """Write the index as a directory at ``path``, replacing any existing one."""
+        with self._lock:
+            arrays = {name: getattr(self, name) for name in ARRAYS}
+        manifest = {
+            'format': FORMAT,
+            'version': FORMAT_VERSION,
+            'disease': self.name,
+            'feature_names': list(datasets.FEATURES[self.name]),
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+            'dataset_sha256': self.dataset_sha256,
+            'records': len(arrays['features']),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        }
+        package.write_directory(path, {name + '.npy': array for name, array in arrays.items()}, manifest)
+        return path
+
+
+def load(path, mmap=True):
+    with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest.get('format') != FORMAT or manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"'{path}' is not a version {FORMAT_VERSION} {FORMAT} index.")
+    arrays = {name: np.asarray(np.load(os.path.join(path, name + '.npy'), mmap_mode='r' if mmap else None,
+                                       allow_pickle=False))
+              for name in ARRAYS}
+    if len(arrays['features']) != manifest['records']:
+        raise ValueError(f"'{path}' holds {len(arrays['features'])} records, "
+                         f"the manifest declares {manifest['records']}.")
+    return NeighborIndex(manifest['disease'], arrays['features'], arrays['labels'], arrays['rows'],
+                         arrays['ids'], manifest['mean'], manifest['scale'], manifest['dataset_sha256'],
+                         standardized=arrays['standardized'])
+
+
+def build(name, model_dir=SAVED_MODELS_DIR):
+    """Build the index of ``name`` from its dataset and persist it; returns the index."""
+    index = NeighborIndex.from_dataset(name)
+    index.save(index_path(name, model_dir))
+    return index
+
+
+# --- Shared indexes ---
+_indexes = {}
+_indexes_guard = threading.Lock()
+
+
+def get_index(name, model_dir=SAVED_MODELS_DIR):
+    """Return the process-wide index of ``name``, rebuilding it when the dataset has changed."""
+    index = _indexes.get(name)
+    if index is None:
+        with _indexes_guard:
+            index = _indexes.get(name)
+            if index is None:
+                path = index_path(name, model_dir)
+                index = load(path) if package.settled(path) else None
+                if index is None or index.dataset_sha256 != linear.file_sha256(datasets.dataset_path(name)):
+                    index = NeighborIndex.from_dataset(name)
+                _indexes[name] = index
+    return index
+
+
+def similar(name, X, k=5):
+    return get_index(name).similar(X, k)
+
+
+def main(argv=None):
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Build the similar-patient indexes from dataset/*.csv.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('diseases', nargs='*', default=list(DISEASES))
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.diseases if name not in DISEASES]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+
+    for name in args.diseases:
+        start = time.perf_counter()
+        index = build(name)
+        print(f"{name}: {len(index)} records, {time.perf_counter() - start:.2f}s -> {index_path(name)}",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
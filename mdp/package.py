@@ -0,0 +1,238 @@
+"""Versioned model packages: a JSON manifest plus raw ``.npy`` arrays.
+
+A package is a directory next to the ``.sav`` file it was converted from::
+
+    saved_models/cancer.mdp/
+        manifest.json     format, kind, classes, feature order, provenance
+        feature.npy       one file per array of the scoring engine
+        threshold.npy
+        ...
+
+``load`` opens the arrays with ``np.load(mmap_mode='r')``: nothing is copied or
+unpickled, so opening a package takes a few milliseconds without importing
+sklearn, and every process that maps the same files shares one read-only copy
+of the nodes in the OS page cache instead of holding a private one.
+
+The manifest records the SHA-256 of the source ``.sav``, the sklearn version
+that produced it, the feature order and, when the model came from
+``mdp.train``, the SHA-256 of its training data.  The registry only uses a
+package whose ``source_sha256`` matches the current ``.sav``.
+
+    python -m mdp.package convert      # write saved_models/*.mdp from the .sav files
+    python -m mdp.package verify       # compare package predictions with the pickles
+"""
+import glob
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from mdp import forest, linear
+
+FORMAT = 'mdp-package'
+FORMAT_VERSION = 1
+PACKAGE_SUFFIX = '.mdp'
+MANIFEST_FILE = 'manifest.json'
+
+# Arrays of each kind of scoring engine, in the attribute names the engine uses.
+ARRAYS = {
+    'forest': ('feature', 'threshold', 'left', 'right', 'value', 'offsets'),
+    'linear': ('coef_', 'intercept_'),
+}
+
+
+def package_path(model_path):
+    return os.path.splitext(model_path)[0] + PACKAGE_SUFFIX
+
+
+def manifest_path(model_path):
+    return os.path.join(package_path(model_path), MANIFEST_FILE)
+
+
+def _kind(predictor):
+    if isinstance(predictor, forest.CompiledForest):
+        return 'forest'
+    if isinstance(predictor, linear.LinearModel):
+        return 'linear'
+    raise TypeError(f"Cannot package {type(predictor).__name__}; expected a CompiledForest or LinearModel.")
+
+
+def write_directory(path, arrays, manifest):
+    """Replace the directory at ``path`` with ``{file name: array}`` and ``manifest.json``.
+
+    The directory is written under a temporary name and renamed into place.
+    An existing directory must first be renamed out of the way, so for a moment
+    between the two renames nothing is at ``path`` while ``path.old-<pid>``
+    exists; readers call ``settled`` to wait that moment out rather than fall
+    back to another artifact.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for file_name, array in arrays.items():
+        np.save(os.path.join(tmp_path, file_name), np.ascontiguousarray(array), allow_pickle=False)
+    # The manifest goes last: the registry watches it, so it must never precede the arrays.
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+        file.write('\n')
+
+    # Processes still mapping the old arrays keep them; only the directory entry moves.
+    old_path = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return path
+
+
+def settled(path, timeout=1.0):
+    """Whether a directory written by ``write_directory`` is at ``path``, waiting out a swap in progress."""
+    manifest = os.path.join(path, MANIFEST_FILE)
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(manifest) and glob.glob(glob.escape(path) + '.old-*'):
+        # A writer that died mid-swap leaves its .old- directory behind; stop waiting eventually.
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(0.005)
+    return os.path.exists(manifest)
+
+
+def save(predictor, path, source_sha256=None, sklearn_version=None, data_sha256=None, compression=None):
+    """Write ``predictor`` as a package directory at ``path``, replacing any existing one.
+
+    ``compression`` records the ``mdp.compress`` settings when the forest was shrunk.
+    """
+    kind = _kind(predictor)
+    names = getattr(predictor, 'feature_names_in_', None)
+    manifest = {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'kind': kind,
+        'classes': np.asarray(predictor.classes_).tolist(),
+        'n_features_in': int(predictor.n_features_in_),
+        'feature_names': None if names is None else [str(name) for name in names],
+        'source_sha256': source_sha256,
+        'sklearn_version': sklearn_version,
+        'data_sha256': data_sha256,
+        'compression': compression,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'arrays': {},
+    }
+    if kind == 'forest':
+        manifest['max_depth'] = predictor.max_depth
+    else:
+        manifest['linear_kind'] = predictor.kind
+
+    files = {}
+    for name in ARRAYS[kind]:
+        array = np.ascontiguousarray(getattr(predictor, name))
+        file_name = name.strip('_') + '.npy'
+        files[file_name] = array
+        manifest['arrays'][name] = {'file': file_name, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+    write_directory(path, files, manifest)
+    return path
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE), encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest.get('format') != FORMAT or manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"'{path}' is not a version {FORMAT_VERSION} {FORMAT} package.")
+    return manifest
+
+
+def load(path, mmap=True):
+    """Open the package at ``path``; arrays are memory-mapped read-only unless ``mmap`` is False."""
+    manifest = read_manifest(path)
+    kind = manifest['kind']
+    arrays = {}
+    for name in ARRAYS[kind]:
+        spec = manifest['arrays'][name]
+        array = np.load(os.path.join(path, spec['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ValueError(f"'{path}': {spec['file']} is {array.dtype.str}{list(array.shape)}, "
+                             f"the manifest declares {spec['dtype']}{spec['shape']}.")
+        # A plain ndarray view of the mapping: indexing np.memmap itself is several times slower.
+        arrays[name.strip('_')] = np.asarray(array)
+
+    classes = np.asarray(manifest['classes'])
+    names = manifest.get('feature_names')
+    names = None if names is None else np.asarray(names, dtype=object)
+    if kind == 'forest':
+        model = forest.CompiledForest(classes=classes, n_features_in=manifest['n_features_in'],
+                                      feature_names_in=names, max_depth=manifest['max_depth'], **arrays)
+    else:
+        model = linear.LinearModel(arrays['coef'], arrays['intercept'], classes, manifest['linear_kind'],
+                                   feature_names_in=names)
+    model.source_sha256 = manifest.get('source_sha256')
+    model.manifest = manifest
+    return model
+
+
+def load_pickle(model_path):
+    """Unpickle the model at ``model_path``; returns ``(model, version of sklearn that pickled it)``."""
+    import pickle
+    import warnings
+
+    import sklearn
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        with open(model_path, 'rb') as file:
+            model = pickle.load(file)
+    # sklearn pops the pickled _sklearn_version on load and only reports it when it differs from ours.
+    versions = [w.message.original_sklearn_version for w in caught
+                if hasattr(w.message, 'original_sklearn_version')]
+    return model, versions[0] if versions else sklearn.__version__
+
+
+def convert(model_path, data_sha256=None):
+    """Write the package for the pickled model at ``model_path``; returns the package path."""
+    from mdp.registry import fast_predictor
+
+    model, sklearn_version = load_pickle(model_path)
+    predictor = linear.from_sklearn(model) if linear.is_linear(model) else fast_predictor(model)
+    return save(predictor, package_path(model_path), source_sha256=linear.file_sha256(model_path),
+                sklearn_version=sklearn_version, data_sha256=data_sha256)
+
+
+def main(argv=None):
+    import argparse
+    import pickle
+
+    from mdp import datasets, train
+    from mdp.diseases import DISEASES
+    from mdp.registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Convert the saved models to memory-mapped packages.')
+    parser.add_argument('command', choices=['convert', 'verify'])
+    parser.add_argument('diseases', nargs='*', default=list(DISEASES))
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry()
+    manifest = train.read_manifest()
+    failed = False
+    for name in args.diseases:
+        model_path = registry.path_for(name)
+        if args.command == 'convert':
+            # The training data is only known for models that mdp.train produced, not adopted ones.
+            record = manifest.get(name) or {}
+            known = record.get('model_sha256') == linear.file_sha256(model_path) and 'adopted_at' not in record
+            path = convert(model_path, data_sha256=record.get('dataset_sha256') if known else None)
+            print(f"{name}: wrote {path}")
+            continue
+        with open(model_path, 'rb') as file:
+            model = pickle.load(file)
+        packaged = load(package_path(model_path))
+        X, _ = datasets.prepare(name, datasets.read_csv(name))
+        X = X[X.notna().all(axis=1)].to_numpy()
+        mismatches = int((model.predict(X) != packaged.predict(X)).sum())
+        failed |= mismatches > 0
+        print(f"{name}: {len(X)} rows, {mismatches} label mismatches")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,247 @@
+"""Process-wide, lazily populated registry of the saved models.
+
+Streamlit re-executes ``app.py`` on every widget interaction, but imported
+modules stay in ``sys.modules``.  Keeping the registry at module level therefore
+shares one copy of each model between all sessions and reruns of a server
+process, and a model is only unpickled the first time a page asks for it.
+"""
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+
+import numpy as np
+
+from mdp import forest, linear, metrics, package
+from mdp.diseases import SAVED_MODELS_DIR, get_disease
+from mdp.schema import get_schema
+
+logger = logging.getLogger(__name__)
+
+
+class ModelEntry:
+    """A loaded model together with the state of the files it was loaded from."""
+
+    def __init__(self, name, path, model, files, load_seconds, generation):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.predictor = fast_predictor(model)
+        self.files = files
+        self.load_seconds = load_seconds
+        self.generation = generation
+        # SHA-256 of the .sav the model came from, whichever artifact was actually loaded.
+        self.version = getattr(model, 'source_sha256', None) or linear.file_sha256(path)
+        self.nbytes = estimate_nbytes((model, self.predictor))
+        self.loaded_at = time.time()
+        self.checked_at = time.monotonic()
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'path': self.path,
+            'file_bytes': _disk_bytes(self.path),
+            'resident_bytes': self.nbytes,
+            'load_seconds': self.load_seconds,
+            'generation': self.generation,
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Loads each model on first use and reloads it when its file changes.
+
+    Every model is checked against its ``mdp.schema`` input schema as it is
+    loaded, so a model trained on a different feature order fails loudly
+    (``SchemaError``) instead of silently scoring shuffled inputs.
+
+    ``check_interval`` throttles how often the file's mtime is re-checked, so
+    ``get`` costs a dict lookup on the hot path.  A reload replaces the entry in
+    place; callers holding the previous model keep a valid object.  Callbacks
+    registered with ``subscribe`` are called with the model name whenever a
+    loaded model is replaced or evicted.
+    """
+
+    def __init__(self, model_dir=SAVED_MODELS_DIR, check_interval=1.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._entries = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._listeners = []
+
+    def path_for(self, name):
+        return os.path.join(self.model_dir, get_disease(name).model_file)
+
+    def get(self, name):
+        return self.entry(name).model
+
+    def predictor(self, name):
+        """Return the fastest equivalent of the model for scoring (see ``fast_predictor``)."""
+        return self.entry(name).predictor
+
+    def entry(self, name):
+        entry = self._entries.get(name)
+        if entry is not None and not self._needs_check(entry):
+            return entry
+        with self._lock_for(name):
+            entry = self._entries.get(name)
+            if entry is None or self._is_stale(entry):
+                previous, entry = entry, self._load(name, previous=entry)
+                self._entries[name] = entry
+                if previous is not None and entry is not previous:
+                    self._notify(name)
+            return entry
+
+    def loaded(self):
+        return sorted(self._entries)
+
+    def stats(self):
+        return [self._entries[name].as_dict() for name in self.loaded()]
+
+    def evict(self, name):
+        with self._lock_for(name):
+            if self._entries.pop(name, None) is not None:
+                self._notify(name)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    # --- Internals ---
+    def _lock_for(self, name):
+        with self._locks_guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def _notify(self, name):
+        for callback in list(self._listeners):
+            try:
+                callback(name)
+            except Exception:
+                logger.exception("Model change listener failed for '%s'", name)
+
+    def _needs_check(self, entry):
+        return time.monotonic() - entry.checked_at >= self.check_interval
+
+    def _is_stale(self, entry):
+        entry.checked_at = time.monotonic()
+        return _file_states(entry.files) != entry.files
+
+    def _watched_paths(self, name):
+        path = self.path_for(name)
+        return [path, package.manifest_path(path), linear.artifact_path(path)]
+
+    def _open(self, name):
+        """Unpickle ``name``, preferring an up-to-date sklearn-free package or artifact when one exists."""
+        path, manifest_path, linear_path = self._watched_paths(name)
+        package_path = os.path.dirname(manifest_path)
+        if package.settled(package_path):
+            model = package.load(package_path)
+            if not os.path.exists(path) or model.source_sha256 == linear.file_sha256(path):
+                return package_path, model
+            logger.warning("Ignoring %s: it was converted from a different %s", package_path, path)
+        if os.path.exists(linear_path):
+            model = linear.load(linear_path)
+            if not os.path.exists(path) or model.source_sha256 == linear.file_sha256(path):
+                return linear_path, model
+            logger.warning("Ignoring %s: it was exported from a different %s", linear_path, path)
+        with open(path, 'rb') as file:
+            return path, pickle.load(file)
+
+    def _load(self, name, previous=None):
+        files = _file_states(dict.fromkeys(self._watched_paths(name)))
+        try:
+            with metrics.span('load', name):
+                start = time.perf_counter()
+                path, model = self._open(name)
+                load_seconds = time.perf_counter() - start
+                get_schema(name).check_model(model)
+        except Exception:
+            if previous is None:
+                raise
+            logger.exception("Reloading model '%s' failed; keeping the previous version", name)
+            previous.checked_at = time.monotonic()
+            return previous
+        generation = previous.generation + 1 if previous is not None else 1
+        logger.info("Loaded model '%s' from %s in %.3fs", name, path, load_seconds)
+        return ModelEntry(name, path, model, files, load_seconds, generation)
+
+
+def _file_states(paths):
+    """Map each path to its (mtime, size), or None when the file does not exist."""
+    states = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            states[path] = None
+        else:
+            states[path] = (st.st_mtime_ns, st.st_size)
+    return states
+
+
+def _disk_bytes(path):
+    """Size of a model file, or of all files of a package directory."""
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+    return os.path.getsize(path) if os.path.exists(path) else None
+
+
+def fast_predictor(model):
+    """Swap sklearn estimators for the NumPy engines that give identical predictions."""
+    if forest.is_forest(model):
+        return forest.compile_forest(model)
+    return model
+
+
+def estimate_nbytes(obj):
+    """Approximate the private memory held by ``obj``, following numpy buffers and pickled state."""
+    # Keep every visited object alive so that ids of temporary state dicts are not reused.
+    seen = {}
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen[id(item)] = item
+        if isinstance(item, np.ndarray):
+            # Views of another array are counted through that array instead; this
+            # includes memory-mapped package arrays, which live in the shared page cache.
+            total += 0 if isinstance(item.base, np.ndarray) else item.nbytes
+            if item.dtype == object:
+                stack.extend(item.ravel())
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, (str, bytes, int, float, bool, type(None))):
+            continue
+        elif hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+        elif hasattr(item, '__getstate__'):
+            # Cython extension types such as sklearn's Tree expose their arrays here.
+            try:
+                stack.append(item.__getstate__())
+            except TypeError:
+                pass
+    return total
+
+
+# --- Shared instance ---
+_registry = None
+_registry_guard = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_guard:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
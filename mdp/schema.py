@@ -0,0 +1,401 @@
+"""Declarative per-disease input schemas and their vectorized converters.
+
+A ``Schema`` lists, in the model's feature order, every input field with its
+type, valid range, UI default and categorical encoding.  ``Schema.convert``
+validates and encodes a whole table of raw values (strings from text inputs or
+CSV cells, numbers from JSON) in one NumPy pass per field and reports every bad
+cell rather than stopping at the first one.  The Streamlit pages, the batch
+scorer and the HTTP API all go through it, and the registry checks each model
+against its schema when it is loaded.
+"""
+from dataclasses import dataclass, field as dataclass_field, replace
+
+import numpy as np
+
+FLOAT = 'float'
+INT = 'int'
+CATEGORY = 'category'
+
+REQUIRED = 'a value is required'
+
+
+class SchemaError(ValueError):
+    """Raised with every problem found; ``errors`` holds the individual ``FieldError``s."""
+
+    def __init__(self, errors, message=None):
+        self.errors = list(errors)
+        super().__init__(message or '; '.join(str(e) for e in self.errors[:10]) +
+                         (f" (and {len(self.errors) - 10} more)" if len(self.errors) > 10 else ''))
+
+
+@dataclass(frozen=True)
+class FieldError:
+    row: int
+    field: str
+    value: object
+    message: str
+
+    @property
+    def missing(self):
+        return self.message == REQUIRED
+
+    def __str__(self):
+        return f"row {self.row}, {self.field}: {self.message} (got {self.value!r})"
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str                  # model feature name
+    label: str                 # UI label
+    kind: str = FLOAT
+    min: float = None
+    max: float = None
+    default: object = 0        # initial UI value
+    missing: float = None      # value used for blank cells; None means the field is required
+    categories: dict = None    # raw label -> code, for CATEGORY fields
+    source: str = None         # column name in dataset/*.csv, when it differs from ``name``
+
+    @property
+    def column(self):
+        return self.source or self.name
+
+
+@dataclass
+class ConversionResult:
+    X: np.ndarray              # float64 (rows, fields); NaN where a cell was rejected
+    errors: list = dataclass_field(default_factory=list)
+    filled: np.ndarray = None  # bool (rows, fields); True where a blank cell got the field's ``missing``
+
+    @property
+    def valid(self):
+        """Boolean mask of rows without any error."""
+        return ~np.isnan(self.X).any(axis=1)
+
+
+def _parse_floats(text):
+    """Parse an array of stripped strings to float64, NaN where a cell is not a number."""
+    try:
+        return text.astype(np.float64)
+    except ValueError:
+        pass
+    out = np.empty(len(text), dtype=np.float64)
+    for i, value in enumerate(text):
+        try:
+            out[i] = float(value)
+        except ValueError:
+            out[i] = np.nan
+    return out
+
+
+# Cell types that need no checking; anything else is inspected cell by cell.
+_PLAIN_CELLS = {str, int, float, type(None)}
+
+
+def _cells(column):
+    """Return ``column`` as a 1D array and the problem code of each cell (0 ok).
+
+    JSON booleans (2) and nested lists or objects (5) are rejected here: NumPy
+    would otherwise turn ``true`` into 1 and flatten ``[[1], [2]]`` into numbers.
+    """
+    values = np.asarray(column) if hasattr(column, 'dtype') else list(column)
+    if isinstance(values, np.ndarray):
+        if values.ndim != 1:
+            raise SchemaError([], f"Expected a column of single values, got an array of shape {values.shape}.")
+        if values.dtype.kind == 'b':
+            return values.astype(object), np.full(len(values), 2, dtype=np.int8)
+        if values.dtype != object:
+            return values, np.zeros(len(values), dtype=np.int8)
+    problems = np.zeros(len(values), dtype=np.int8)
+    if set(map(type, values)) <= _PLAIN_CELLS:
+        return np.asarray(values), problems
+    cells = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        cells[i] = value
+        if isinstance(value, (bool, np.bool_)):
+            problems[i] = 2
+        elif isinstance(value, (list, tuple, dict, set, np.ndarray)):
+            problems[i] = 5
+    return cells, problems
+
+
+class Schema:
+
+    def __init__(self, disease, fields):
+        self.disease = disease
+        self.fields = list(fields)
+        self.names = [f.name for f in self.fields]
+        self.columns = [f.column for f in self.fields]
+        self._compile()
+
+    def __len__(self):
+        return len(self.fields)
+
+    def field(self, name):
+        return self.fields[self.names.index(name)]
+
+    def with_missing(self, values):
+        """A copy in which required fields fill blank cells with ``values[name]`` instead of rejecting them."""
+        return Schema(self.disease, [replace(f, missing=values[f.name]) if f.missing is None and f.name in values
+                                     else f for f in self.fields])
+
+    def _compile(self):
+        self._lo = np.array([-np.inf if f.min is None else f.min for f in self.fields])
+        self._hi = np.array([np.inf if f.max is None else f.max for f in self.fields])
+        self._integer = np.array([f.kind == INT for f in self.fields])
+        self._lookups = {}
+        for j, f in enumerate(self.fields):
+            if f.kind == CATEGORY:
+                keys = sorted(f.categories)
+                codes = np.array([f.categories[k] for k in keys], dtype=np.float64)
+                self._lookups[j] = (np.array(keys, dtype=str), codes)
+
+    # --- Conversion ---
+    def convert(self, table):
+        """Validate and encode ``table``: a mapping (or DataFrame) of column -> sequence of raw values.
+
+        Columns are looked up by feature name first, then by their dataset CSV name.
+        """
+        missing = [f.name for f in self.fields if f.name not in table and f.column not in table]
+        if missing:
+            raise SchemaError([], f"Input for '{self.disease}' is missing columns: {', '.join(missing)}")
+        columns = [table[f.name] if f.name in table else table[f.column] for f in self.fields]
+        n_rows = len(columns[0]) if columns else 0
+        X = np.empty((n_rows, len(self.fields)), dtype=np.float64)
+        raw = []
+        # 0 ok, 1 missing, 2 not a number/category, 3 range, 4 not int, 5 not a single value
+        problems = np.zeros(X.shape, dtype=np.int8)
+        filled_cells = np.zeros(X.shape, dtype=bool)
+
+        for j, (f, column) in enumerate(zip(self.fields, columns)):
+            values, rejected = _cells(column)
+            if len(values) != n_rows:
+                raise SchemaError([], f"Column '{f.name}' has {len(values)} values, expected {n_rows}.")
+            raw.append(values)
+            bad = rejected > 0
+            if bad.any():
+                # Parsed as blanks, then reported with their own problem below.
+                values = np.where(bad, None, values)
+            if values.dtype.kind in 'biuf':
+                # Already numeric (JSON numbers, parsed CSV columns): no text handling needed.
+                parsed = values.astype(np.float64)
+                blank = np.isnan(parsed)
+                if f.kind == CATEGORY:
+                    parsed[~np.isin(parsed, self._lookups[j][1])] = np.nan
+            else:
+                text = np.char.strip(values.astype(str))
+                blank = (text == '') | (text == 'nan') | (text == 'None')
+                parsed = np.full(n_rows, np.nan)
+                filled = ~blank
+                parsed[filled] = (self._encode(j, text[filled]) if f.kind == CATEGORY
+                                  else _parse_floats(text[filled]))
+            blank &= ~bad
+            X[:, j] = parsed
+            if f.missing is not None:
+                X[blank, j] = f.missing
+                filled_cells[:, j] = blank
+            else:
+                problems[blank, j] = 1
+            problems[~blank & np.isnan(parsed), j] = 2
+            problems[bad, j] = rejected[bad]
+
+        finite = ~np.isnan(X)
+        with np.errstate(invalid='ignore'):
+            out_of_range = finite & ((X < self._lo) | (X > self._hi) | np.isinf(X))
+            not_integer = finite & self._integer & (X != np.round(X)) & ~out_of_range
+        problems[out_of_range] = 3
+        problems[not_integer] = 4
+
+        errors = []
+        if problems.any():
+            for i, j in zip(*np.nonzero(problems)):
+                value = raw[j][i]
+                value = value.item() if isinstance(value, np.generic) else value
+                errors.append(FieldError(int(i), self.fields[j].name, value, self._describe(j, problems[i, j])))
+            X[problems.any(axis=1)] = np.nan
+        return ConversionResult(X, errors, filled_cells)
+
+    def convert_records(self, records):
+        """Convert a list of dicts keyed by feature (or dataset column) name."""
+        table = {}
+        for f in self.fields:
+            key = f.name if any(f.name in r for r in records) else f.column
+            table[f.name] = [r.get(key) for r in records]
+        return self.convert(table)
+
+    def convert_rows(self, rows):
+        """Convert positional rows given in the model's feature order."""
+        for i, row in enumerate(rows):
+            if len(row) != len(self.fields):
+                raise SchemaError([], f"Row {i}: expected {len(self.fields)} values in the order {self.names}.")
+        return self.convert(dict(zip(self.names, zip(*rows)))) if rows else self.convert({n: [] for n in self.names})
+
+    def parse(self, table):
+        """Like ``convert`` but raise ``SchemaError`` if any cell is invalid."""
+        result = self.convert(table)
+        if result.errors:
+            raise SchemaError(result.errors)
+        return result.X
+
+    def _encode(self, j, text):
+        keys, codes = self._lookups[j]
+        positions = np.searchsorted(keys, text).clip(0, len(keys) - 1)
+        out = np.where(keys[positions] == text, codes[positions], np.nan)
+        # Also accept the numeric codes themselves (e.g. 0/1 from JSON clients).
+        unmatched = np.isnan(out)
+        if unmatched.any():
+            numeric = _parse_floats(text[unmatched])
+            out[unmatched] = np.where(np.isin(numeric, codes), numeric, np.nan)
+        return out
+
+    def _describe(self, j, problem):
+        f = self.fields[j]
+        if problem == 1:
+            return REQUIRED
+        if problem == 2:
+            if f.kind == CATEGORY:
+                return f"expected one of {', '.join(f.categories)}"
+            return 'expected a number'
+        if problem == 3:
+            bounds = [f"at least {f.min:g}" if f.min is not None else None,
+                      f"at most {f.max:g}" if f.max is not None else None]
+            return 'must be ' + ' and '.join(b for b in bounds if b)
+        if problem == 4:
+            return 'must be a whole number'
+        return 'expected a single value'
+
+    # --- Model checks ---
+    def check_model(self, model):
+        """Raise ``SchemaError`` unless ``model`` takes exactly this schema's features, in order."""
+        n_features = getattr(model, 'n_features_in_', None)
+        if n_features is not None and n_features != len(self.fields):
+            raise SchemaError([], f"The {self.disease} model expects {n_features} features, but its "
+                                  f"schema declares {len(self.fields)} ({', '.join(self.names)}).")
+        names = getattr(model, 'feature_names_in_', None)
+        if names is not None and list(names) != self.names:
+            raise SchemaError([], f"The {self.disease} model's feature order {list(names)} does not match "
+                                  f"its schema {self.names}.")
+
+
+# --- Schemas ---
+_BINARY = {'no': 0, 'yes': 1}
+
+SCHEMAS = {s.disease: s for s in (
+    Schema('diabetes', [
+        Field('Pregnancies', 'Number of Pregnancies', INT, 0, 30),
+        Field('Glucose', 'Glucose Level', FLOAT, 0, 600),
+        Field('BloodPressure', 'Blood Pressure value', FLOAT, 0, 300),
+        Field('SkinThickness', 'Skin Thickness value', FLOAT, 0, 200),
+        Field('Insulin', 'Insulin Level', FLOAT, 0, 2000),
+        Field('BMI', 'BMI value', FLOAT, 0, 100),
+        Field('DiabetesPedigreeFunction', 'Diabetes Pedigree Function value', FLOAT, 0, 5),
+        Field('Age', 'Age of the Person', INT, 0, 120),
+    ]),
+    Schema('heart', [
+        Field('age', 'Age', INT, 0, 120),
+        Field('sex', 'Sex (0=Female, 1=Male)', INT, 0, 1),
+        Field('cp', 'Chest Pain types (0-3)', INT, 0, 3),
+        Field('trestbps', 'Resting Blood Pressure', FLOAT, 0, 300),
+        Field('chol', 'Serum Cholestoral in mg/dl', FLOAT, 0, 1000),
+        Field('fbs', 'Fasting Blood Sugar > 120 mg/dl (0=No, 1=Yes)', INT, 0, 1),
+        Field('restecg', 'Resting Electrocardiographic results (0-2)', INT, 0, 2),
+        Field('thalach', 'Maximum Heart Rate achieved', FLOAT, 0, 300),
+        Field('exang', 'Exercise Induced Angina (0=No, 1=Yes)', INT, 0, 1),
+        Field('oldpeak', 'ST depression induced by exercise', FLOAT, 0, 10),
+        Field('slope', 'Slope of the peak exercise ST segment (0-2)', INT, 0, 2),
+        Field('ca', 'Major vessels colored by flourosopy (0-4)', INT, 0, 4),
+        Field('thal', 'thal: 0=normal, 1=fixed defect, 2=reversable defect', INT, 0, 3),
+    ]),
+    Schema('parkinsons', [
+        Field('MDVP:Fo(Hz)', 'MDVP:Fo(Hz)', FLOAT, 0, 1000),
+        Field('MDVP:Fhi(Hz)', 'MDVP:Fhi(Hz)', FLOAT, 0, 1000),
+        Field('MDVP:Flo(Hz)', 'MDVP:Flo(Hz)', FLOAT, 0, 1000),
+        Field('MDVP:Jitter(%)', 'MDVP:Jitter(%)', FLOAT, 0, 1),
+        Field('MDVP:Jitter(Abs)', 'MDVP:Jitter(Abs)', FLOAT, 0, 1),
+        Field('MDVP:RAP', 'MDVP:RAP', FLOAT, 0, 1),
+        Field('MDVP:PPQ', 'MDVP:PPQ', FLOAT, 0, 1),
+        Field('Jitter:DDP', 'Jitter:DDP', FLOAT, 0, 1),
+        Field('MDVP:Shimmer', 'MDVP:Shimmer', FLOAT, 0, 1),
+        Field('MDVP:Shimmer(dB)', 'MDVP:Shimmer(dB)', FLOAT, 0, 10),
+        Field('Shimmer:APQ3', 'Shimmer:APQ3', FLOAT, 0, 1),
+        Field('Shimmer:APQ5', 'Shimmer:APQ5', FLOAT, 0, 1),
+        Field('MDVP:APQ', 'MDVP:APQ', FLOAT, 0, 1),
+        Field('Shimmer:DDA', 'Shimmer:DDA', FLOAT, 0, 1),
+        Field('NHR', 'NHR', FLOAT, 0, 10),
+        Field('HNR', 'HNR', FLOAT, 0, 100),
+        Field('RPDE', 'RPDE', FLOAT, 0, 1),
+        Field('DFA', 'DFA', FLOAT, 0, 1),
+        Field('spread1', 'spread1', FLOAT, -20, 20),
+        Field('spread2', 'spread2', FLOAT, 0, 5),
+        Field('D2', 'D2', FLOAT, 0, 10),
+        Field('PPE', 'PPE', FLOAT, 0, 5),
+    ]),
+    Schema('cancer', [
+        Field('radius_mean', 'Radius Mean', FLOAT, 0, 100),
+        Field('texture_mean', 'Texture Mean', FLOAT, 0, 100),
+        Field('perimeter_mean', 'Perimeter Mean', FLOAT, 0, 1000),
+        Field('area_mean', 'Area Mean', FLOAT, 0, 10000),
+        Field('smoothness_mean', 'Smoothness Mean', FLOAT, 0, 1),
+        Field('compactness_mean', 'Compactness Mean', FLOAT, 0, 2),
+        Field('concavity_mean', 'Concavity Mean', FLOAT, 0, 2),
+        Field('concave points_mean', 'Concave Points Mean', FLOAT, 0, 1),
+        Field('symmetry_mean', 'Symmetry Mean', FLOAT, 0, 1),
+        Field('radius_se', 'Radius SE', FLOAT, 0, 10),
+        Field('perimeter_se', 'Perimeter SE', FLOAT, 0, 100),
+        Field('area_se', 'Area SE', FLOAT, 0, 2000),
+        Field('compactness_se', 'Compactness SE', FLOAT, 0, 1),
+        Field('concavity_se', 'Concavity SE', FLOAT, 0, 1),
+        Field('concave points_se', 'Concave Points SE', FLOAT, 0, 1),
+        Field('fractal_dimension_se', 'Fractal Dimension SE', FLOAT, 0, 1),
+        Field('radius_worst', 'Radius Worst', FLOAT, 0, 100),
+        Field('texture_worst', 'Texture Worst', FLOAT, 0, 100),
+        Field('perimeter_worst', 'Perimeter Worst', FLOAT, 0, 1000),
+        Field('area_worst', 'Area Worst', FLOAT, 0, 10000),
+        Field('smoothness_worst', 'Smoothness Worst', FLOAT, 0, 1),
+        Field('compactness_worst', 'Compactness Worst', FLOAT, 0, 3),
+        Field('concavity_worst', 'Concavity Worst', FLOAT, 0, 3),
+        Field('concave points_worst', 'Concave Points Worst', FLOAT, 0, 1),
+        Field('symmetry_worst', 'Symmetry Worst', FLOAT, 0, 2),
+        Field('fractal_dimension_worst', 'Fractal Dimension Worst', FLOAT, 0, 1),
+    ]),
+    Schema('liver', [
+        Field('Age', 'Age', INT, 0, 120),
+        Field('Total_Bilirubin', 'Total Bilirubin', FLOAT, 0, 100),
+        Field('Direct_Bilirubin', 'Direct Bilirubin', FLOAT, 0, 50),
+        Field('Alkaline_Phosphotase', 'Alkaline Phosphotase', FLOAT, 0, 5000),
+        Field('Alamine_Aminotransferase', 'Alamine Aminotransferase', FLOAT, 0, 5000),
+        Field('Aspartate_Aminotransferase', 'Aspartate Aminotransferase', FLOAT, 0, 10000),
+        Field('Total_Protiens', 'Total Protiens', FLOAT, 0, 20),
+        Field('Albumin', 'Albumin', FLOAT, 0, 10),
+        # The liver notebook filled the four blank ratios with this value.
+        Field('Albumin_and_Globulin_Ratio', 'Albumin and Globulin Ratio', FLOAT, 0, 10, missing=0.947064),
+        Field('Gender_Male', 'Gender', CATEGORY, default='Male',
+              categories={'Male': 1, 'Female': 0}, source='Gender'),
+    ]),
+    Schema('kidney', [
+        Field('age', 'Age', INT, 0, 120),
+        Field('bp', 'Blood Pressure (mm/Hg)', FLOAT, 0, 300),
+        Field('al', 'Albumin (0-5)', INT, 0, 5),
+        Field('su', 'Sugar (0-5)', INT, 0, 5),
+        Field('rbc', 'Red Blood Cells', CATEGORY, default='normal', categories={'normal': 0, 'abnormal': 1}),
+        Field('pc', 'Pus Cells', CATEGORY, default='normal', categories={'normal': 0, 'abnormal': 1}),
+        Field('pcc', 'Pus Cell Clumps', CATEGORY, default='notpresent', categories={'notpresent': 0, 'present': 1}),
+        Field('ba', 'Bacteria', CATEGORY, default='notpresent', categories={'notpresent': 0, 'present': 1}),
+        Field('bgr', 'Blood Glucose Random (mg/dl)', FLOAT, 0, 1000),
+        Field('bu', 'Blood Urea (mg/dl)', FLOAT, 0, 500),
+        Field('sc', 'Serum Creatinine (mg/dl)', FLOAT, 0, 100),
+        Field('pot', 'Potassium (mEq/L)', FLOAT, 0, 50),
+        Field('wc', 'White Blood Cell Count (cells/cmm)', FLOAT, 0, 50000),
+        Field('htn', 'Hypertension', CATEGORY, default='no', categories=_BINARY),
+        Field('dm', 'Diabetes Mellitus', CATEGORY, default='no', categories=_BINARY),
+        Field('cad', 'Coronary Artery Disease', CATEGORY, default='no', categories=_BINARY),
+        Field('pe', 'Pedal Edema', CATEGORY, default='no', categories=_BINARY),
+        Field('ane', 'Anemia', CATEGORY, default='no', categories=_BINARY),
+    ]),
+)}
+
+
+def get_schema(disease):
+    try:
+        return SCHEMAS[disease]
+    except KeyError:
+        raise KeyError(f"No input schema for '{disease}'.") from None
@@ -0,0 +1,131 @@
+"""Screen one patient record against all six models at once.
+
+A screening record holds the measurements shared between pages once, under the
+keys of ``SHARED_FIELDS``, plus an optional object per disease with that
+model's remaining fields::
+
+    {"age": 54, "sex": "Male", "diastolic_bp": 80, "systolic_bp": 130, "glucose": 148,
+     "diabetes": {"Pregnancies": 0, "SkinThickness": 35, ...},
+     "kidney": {"al": 1, "rbc": "normal", ...}}
+
+``screen`` maps the shared values onto each schema, then converts and scores
+every disease concurrently on a small thread pool.  A disease whose inputs are
+incomplete, or whose entry is not an object, is reported as such instead of
+failing the whole screening.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mdp import service
+from mdp.diseases import DISEASES, diagnosis
+from mdp.registry import get_registry
+from mdp.schema import get_schema
+
+# Shared key -> {disease: (feature name, value mapping or None)}.
+SHARED_FIELDS = {
+    'age': {'diabetes': ('Age', None), 'heart': ('age', None),
+            'liver': ('Age', None), 'kidney': ('age', None)},
+    'sex': {'heart': ('sex', {'Male': 1, 'Female': 0}), 'liver': ('Gender_Male', None)},
+    # Diabetes and kidney record diastolic pressure, the heart dataset resting systolic pressure.
+    'diastolic_bp': {'diabetes': ('BloodPressure', None), 'kidney': ('bp', None)},
+    'systolic_bp': {'heart': ('trestbps', None)},
+    'glucose': {'diabetes': ('Glucose', None), 'kidney': ('bgr', None)},
+}
+
+SHARED_LABELS = {
+    'age': 'Age',
+    'sex': 'Sex',
+    'diastolic_bp': 'Diastolic Blood Pressure (mm/Hg)',
+    'systolic_bp': 'Resting Systolic Blood Pressure (mm/Hg)',
+    'glucose': 'Blood Glucose (mg/dl)',
+}
+
+_executor = None
+_executor_guard = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_guard:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=len(DISEASES), thread_name_prefix='screen')
+    return _executor
+
+
+def shared_features(disease):
+    """Feature names of ``disease`` that are filled from the shared record keys."""
+    return {targets[disease][0] for targets in SHARED_FIELDS.values() if disease in targets}
+
+
+def _entry_error(disease, record):
+    entry = record.get(disease)
+    if entry is not None and not isinstance(entry, dict):
+        return f"expected an object of that model's fields, got {type(entry).__name__}"
+    return None
+
+
+def record_errors(record):
+    """Messages for the per-disease entries of ``record`` that are not objects."""
+    return [f"{name}: {_entry_error(name, record)}" for name in DISEASES if _entry_error(name, record)]
+
+
+def inputs_for(disease, record):
+    """Build the raw input dict for one disease from a screening record."""
+    error = _entry_error(disease, record)
+    if error:
+        raise ValueError(error)
+    inputs = {}
+    for key, targets in SHARED_FIELDS.items():
+        if disease in targets and record.get(key) is not None:
+            feature, mapping = targets[disease]
+            value = record[key]
+            inputs[feature] = mapping.get(value, value) if mapping else value
+    inputs.update(record.get(disease) or {})
+    return inputs
+
+
+def screen_one(disease, record, predict, registry):
+    start = time.perf_counter()
+    report = {'status': 'ok', 'label': None, 'probability': None, 'diagnosis': None, 'errors': []}
+    try:
+        registry.entry(disease)
+    except Exception as e:
+        report.update(status='unavailable', errors=[str(e)])
+    else:
+        try:
+            result = get_schema(disease).convert_records([inputs_for(disease, record)])
+        except ValueError as e:
+            report.update(status='invalid', errors=[f"{disease}: {e}"])
+        else:
+            _score_one(disease, result, predict, report)
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def _score_one(disease, result, predict, report):
+    if result.errors:
+        only_missing = all(e.missing for e in result.errors)
+        report.update(status='incomplete' if only_missing else 'invalid',
+                      errors=[f"{e.field}: {e.message}" for e in result.errors])
+        return
+    try:
+        labels, proba = predict(disease, result.X)
+    except Exception as e:
+        report.update(status='error', errors=[f"An error occurred during prediction: {e}"])
+    else:
+        label = labels[0].item() if hasattr(labels[0], 'item') else labels[0]
+        report.update(label=label, diagnosis=diagnosis(disease, label),
+                      probability=None if proba is None else float(proba[0]))
+
+
+def screen(record, predict=None, registry=None, diseases=None):
+    """Run every model on ``record`` concurrently and return a consolidated report."""
+    registry = registry or get_registry()
+    predict = predict or (lambda name, X: service.predict(name, X, registry, source='screening'))
+    diseases = list(diseases or DISEASES)
+    start = time.perf_counter()
+    futures = {name: _get_executor().submit(screen_one, name, record, predict, registry) for name in diseases}
+    results = {name: future.result() for name, future in futures.items()}
+    return {'diseases': results, 'seconds': time.perf_counter() - start}
@@ -0,0 +1,316 @@
+"""Local HTTP/JSON prediction service with per-model micro-batching.
+
+Endpoints::
+
+    GET  /health              liveness check
+    GET  /models              loaded models and queue depths
+    GET  /cache               prediction cache size and hit/miss/eviction counters
+    GET  /metrics             Prometheus text format (mdp.metrics), plus the /profiler routes
+    POST /predict/<disease>   {"features": [...] | {...}} or {"instances": [...]},
+                              optionally with "neighbors": k and "explain": true
+    POST /screen              one patient record scored by all six models (mdp.screening)
+
+Rows are given either as a list in the model's feature order or as an object
+keyed by feature name, and are validated by the disease's ``mdp.schema``; a 400
+answer lists every invalid field.  With ``"neighbors": k`` each prediction also
+lists the ``k`` most similar labelled dataset records (``mdp.neighbors``), and
+with ``"explain": true`` its per-feature contributions (``mdp.explain``).
+Concurrent requests for the same model are combined by ``mdp.batching.MicroBatcher``; when a model's queue is full the service answers
+503 with ``Retry-After`` instead of queueing without bound.  Rows already in the
+``mdp.cache`` prediction cache are answered without entering a queue.  Every
+scored request is recorded in the ``mdp.audit`` log.  SIGINT/SIGTERM stop
+accepting connections, let in-flight requests finish, then drain the batchers.
+"""
+import argparse
+import json
+import logging
+import signal
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mdp import audit, metrics, neighbors, screening, service
+from mdp.batching import MicroBatcher, Overloaded
+from mdp.cache import cached_predict
+from mdp.diseases import DISEASES
+from mdp.registry import get_registry
+from mdp.schema import SchemaError, get_schema
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the "neighbors" a request may ask for.
+MAX_NEIGHBORS = 50
+
+
+class RequestError(ValueError):
+    """A client error; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, fields=None):
+        super().__init__(message)
+        self.status = status
+        self.fields = fields
+
+
+def parse_rows(name, payload):
+    """Turn a request body into a 2D float array in the model's feature order."""
+    if not isinstance(payload, dict) or ('features' in payload) == ('instances' in payload):
+        raise RequestError("Body must be a JSON object with either 'features' or 'instances'.")
+    instances = [payload['features']] if 'features' in payload else payload['instances']
+    if not isinstance(instances, list) or not instances:
+        raise RequestError("'instances' must be a non-empty list.")
+
+    schema = get_schema(name)
+    if all(isinstance(instance, dict) for instance in instances):
+        unknown = sorted({key for instance in instances for key in instance}
+                         - set(schema.names) - set(schema.columns))
+        if unknown:
+            raise RequestError(f"Unknown fields: {', '.join(unknown)}. Expected: {', '.join(schema.names)}.")
+        convert = schema.convert_records
+    elif all(isinstance(instance, list) for instance in instances):
+        convert = schema.convert_rows
+    else:
+        raise RequestError('Each instance must be a list in feature order or an object keyed by feature name.')
+    try:
+        result = convert(instances)
+    except SchemaError as e:
+        raise RequestError(str(e)) from None
+    if result.errors:
+        raise RequestError(f"{len(result.errors)} invalid field(s).", fields=[
+            {'instance': e.row, 'field': e.field, 'message': e.message} for e in result.errors])
+    return result.X
+
+
+class PredictionService:
+    """Owns one micro-batcher per model and answers parsed requests."""
+
+    def __init__(self, registry=None, max_batch=64, max_wait=0.002, max_queue=1024, timeout=5.0):
+        self.registry = registry or get_registry()
+        self.cache = service.get_cache(self.registry)
+        self.timeout = timeout
+        self.batchers = {
+            name: MicroBatcher(name, self._scorer(name), max_batch=max_batch,
+                               max_wait=max_wait, max_queue=max_queue).start()
+            for name in DISEASES
+        }
+        metrics.REGISTRY.add_collector('models', metrics.model_collector(self.registry, self.cache))
+        metrics.REGISTRY.add_collector('batchers', self._collect_batchers)
+
+    def _scorer(self, name):
+        # Look the predictor up per batch so that reloaded models are picked up.
+        return lambda X: service.score(self.registry.predictor(name), X)
+
+    def predict(self, name, payload):
+        if name not in self.batchers:
+            raise RequestError(f"Unknown disease '{name}'. Expected one of: {', '.join(DISEASES)}", 404)
+        try:
+            entry = self.registry.entry(name)
+        except SchemaError as e:
+            raise RequestError(f"The {name} model is unavailable: {e}", 503) from None
+        with metrics.span('parse', name):
+            X = parse_rows(name, payload)
+        k = payload.get('neighbors', 0)
+        if isinstance(k, bool) or not isinstance(k, int) or not 0 <= k <= MAX_NEIGHBORS:
+            raise RequestError(f"'neighbors' must be an integer between 0 and {MAX_NEIGHBORS}.")
+        if not isinstance(payload.get('explain', False), bool):
+            raise RequestError("'explain' must be true or false.")
+        try:
+            with metrics.span('predict', name):
+                labels, proba = self._batched_predict(name, X, entry)
+        except FutureTimeout:
+            raise RequestError('Prediction timed out.', 504) from None
+        predictions = [
+            {'label': label, 'probability': None if proba is None else float(proba[i])}
+            for i, label in enumerate(labels.tolist())
+        ]
+        if payload.get('explain'):
+            base, contributions, kind = service.explain(name, X, self.registry)
+            names = get_schema(name).names
+            for i, prediction in enumerate(predictions):
+                prediction['explanation'] = {'score': kind, 'base': float(base[i]),
+                                             'contributions': dict(zip(names, contributions[i].tolist()))}
+        if k:
+            with metrics.span('neighbors', name):
+                for prediction, similar in zip(predictions, neighbors.similar(name, X, k)):
+                    prediction['similar'] = similar
+        return {'disease': name, 'model_generation': entry.generation, 'predictions': predictions}
+
+    def screen(self, record):
+        if not isinstance(record, dict):
+            raise RequestError('Body must be a JSON object holding one patient record.')
+        errors = screening.record_errors(record)
+        if errors:
+            raise RequestError(f"{len(errors)} invalid disease entr{'y' if len(errors) == 1 else 'ies'}.",
+                               fields=errors)
+        with metrics.span('screen'):
+            return screening.screen(record, registry=self.registry,
+                                    predict=lambda name, X: self._batched_predict(name, X, source='screening'))
+
+    def _batched_predict(self, name, X, entry=None, source='api'):
+        entry = entry or self.registry.entry(name)
+        compute = lambda rows: self.batchers[name].submit(rows).result(self.timeout)
+        return audit.scored(name, source, X, lambda rows: cached_predict(
+            self.cache, name, entry.generation, service.integral_labels(entry.predictor.classes_), rows,
+            compute), entry.version)
+
+    def status(self):
+        loaded = {info['name']: info for info in self.registry.stats()}
+        return {
+            name: {
+                'loaded': name in loaded,
+                'generation': loaded.get(name, {}).get('generation'),
+                'queue_depth': batcher.depth(),
+                'batches': batcher.batches,
+                'rows': batcher.rows,
+                'rejected': batcher.rejected,
+            }
+            for name, batcher in self.batchers.items()
+        }
+
+    def _collect_batchers(self):
+        batchers = self.batchers.items()
+        return [
+            ('mdp_queue_depth', 'gauge', 'Rows waiting in each model\'s micro-batch queue.',
+             [({'disease': name}, batcher.depth()) for name, batcher in batchers]),
+            ('mdp_batches_total', 'counter', 'Vectorized predict calls made by each batcher.',
+             [({'disease': name}, batcher.batches) for name, batcher in batchers]),
+            ('mdp_batched_rows_total', 'counter', 'Rows scored by each batcher.',
+             [({'disease': name}, batcher.rows) for name, batcher in batchers]),
+            ('mdp_rejected_total', 'counter', 'Requests refused with 503 because a queue was full.',
+             [({'disease': name}, batcher.rejected) for name, batcher in batchers]),
+        ]
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.stop()
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = 'HealthAssistant/1.0'
+    max_body = 1 << 20
+
+    def do_GET(self):
+        if self._metrics('GET'):
+            return
+        if self.path == '/health':
+            self._send(200, {'status': 'ok'})
+        elif self.path == '/models':
+            self._send(200, self.server.service.status())
+        elif self.path == '/cache':
+            self._send(200, self.server.service.cache.stats())
+        else:
+            self._send(404, {'error': f"No route for GET {self.path}"})
+
+    def do_POST(self):
+        if self._metrics('POST'):
+            return
+        prefix = '/predict/'
+        if self.path == '/screen':
+            route = self.server.service.screen
+        elif self.path.startswith(prefix):
+            route = lambda payload: self.server.service.predict(self.path[len(prefix):], payload)
+        else:
+            self._send(404, {'error': f"No route for POST {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > self.max_body:
+                raise RequestError('Request body too large.', 413)
+            try:
+                payload = json.loads(self.rfile.read(length) or b'null')
+            except ValueError:
+                raise RequestError('Body is not valid JSON.') from None
+            self._send(200, route(payload))
+        except RequestError as e:
+            metrics.record_error('request', self._route_label(), f'http_{e.status}')
+            body = {'error': str(e)}
+            if e.fields:
+                body['fields'] = e.fields
+            self._send(e.status, body)
+        except Overloaded as e:
+            metrics.record_error('request', self._route_label(), 'http_503')
+            self._send(503, {'error': str(e)}, {'Retry-After': '1'})
+        except Exception as e:
+            metrics.record_error('request', self._route_label(), type(e).__name__)
+            logger.exception('Prediction request failed')
+            self._send(500, {'error': f"An error occurred during prediction: {e}"})
+
+    def _route_label(self):
+        # Bounded label values: unknown diseases must not create new series.
+        name = self.path.rsplit('/', 1)[-1]
+        return name if name in DISEASES or name == 'screen' else 'unknown'
+
+    def _metrics(self, method):
+        answer = metrics.respond(method, self.path)
+        if answer is None:
+            return False
+        status, content_type, body = answer
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return True
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class PredictionServer(ThreadingHTTPServer):
+    # Let in-flight requests finish on shutdown instead of killing their threads.
+    daemon_threads = False
+    block_on_close = True
+    # Bursts of concurrent clients overflow the default listen backlog of 5.
+    request_queue_size = 256
+
+    def __init__(self, address, prediction_service):
+        super().__init__(address, Handler)
+        self.service = prediction_service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the six disease models over HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--max-batch', type=int, default=64, help='rows per vectorized predict call')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help='batching window under load')
+    parser.add_argument('--max-queue', type=int, default=1024, help='pending requests per model before 503')
+    parser.add_argument('--preload', action='store_true', help='load every model before serving')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    prediction_service = PredictionService(max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000,
+                                 max_queue=args.max_queue)
+    if args.preload:
+        for name in DISEASES:
+            try:
+                prediction_service.registry.entry(name)
+            except SchemaError as e:
+                logger.error('Not serving %s: %s', name, e)
+    server = PredictionServer((args.host, args.port), prediction_service)
+
+    def request_shutdown(signum, frame):
+        logger.info('Received signal %d, shutting down', signum)
+        # shutdown() blocks until serve_forever returns, so it must run on another thread.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    logger.info('Serving predictions on http://%s:%d', args.host, args.port)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        prediction_service.close()
+    return 0
@@ -0,0 +1,88 @@
+"""Scoring entry points shared by the app, the batch scorer and the API."""
+import threading
+import weakref
+
+import numpy as np
+
+from mdp import audit, explain as explainers, metrics
+from mdp.cache import PredictionCache, cached_predict
+from mdp.registry import get_registry
+
+
+def integral_labels(labels):
+    """``labels`` as integers when they are whole-number floats, as the kidney model's classes are."""
+    labels = np.asarray(labels)
+    if labels.dtype.kind == 'f' and np.all(np.mod(labels, 1) == 0):
+        return labels.astype(np.int64)
+    return labels
+
+
+def score(predictor, X):
+    """Return ``(labels, probabilities)`` for a 2D array of rows.
+
+    ``labels`` are integers whenever the classes are whole numbers, so that
+    JSON and CSV output read ``1`` rather than ``1.0``.  ``probabilities`` is
+    the probability of the last class in ``classes_``, or None when the model
+    has no ``predict_proba`` (the linear SVC).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    try:
+        predict_proba = predictor.predict_proba
+    except AttributeError:
+        return integral_labels(predictor.predict(X)), None
+    proba = predict_proba(X)
+    if hasattr(predictor, 'decision_function'):
+        # Linear models label by the sign of the decision, not by argmax of proba.
+        labels = predictor.predict(X)
+    else:
+        # Same rule as the forests' own predict, without traversing the trees twice.
+        labels = predictor.classes_.take(np.argmax(proba, axis=1), axis=0)
+    return integral_labels(labels), proba[:, -1]
+
+
+def predict(name, X, registry=None, cache=True, source=None):
+    """Score rows already in the model's feature order with the registry's predictor for ``name``.
+
+    Rows seen before are answered from the registry's prediction cache; pass
+    ``cache=False`` for one-off bulk scoring that would only churn it.  With a
+    ``source`` (one of ``mdp.audit.SOURCES``) the request is written to the
+    prediction audit log.
+    """
+    registry = registry or get_registry()
+    entry = registry.entry(name)
+    if cache:
+        compute = lambda rows: cached_predict(get_cache(registry), name, entry.generation,
+                                              integral_labels(entry.predictor.classes_), rows,
+                                              lambda missed: score(entry.predictor, missed))
+    else:
+        compute = lambda rows: score(entry.predictor, rows)
+    with metrics.span('predict', name):
+        if source is None:
+            return compute(X)
+        return audit.scored(name, source, X, compute, entry.version)
+
+
+def explain(name, X, registry=None):
+    """Return ``(base, contributions, kind)`` for rows in the model's feature order (``mdp.explain``)."""
+    predictor = (registry or get_registry()).predictor(name)
+    with metrics.span('explain', name):
+        base, contributions = explainers.explain(predictor, X)
+    return base, contributions, explainers.score_kind(predictor)
+
+
+# --- Prediction caches, one per registry ---
+_caches = weakref.WeakKeyDictionary()
+_caches_guard = threading.Lock()
+
+
+def get_cache(registry=None):
+    """Return the cache for ``registry``, emptied per model whenever the registry reloads it."""
+    registry = registry or get_registry()
+    cache = _caches.get(registry)
+    if cache is None:
+        with _caches_guard:
+            cache = _caches.get(registry)
+            if cache is None:
+                cache = _caches[registry] = PredictionCache()
+                registry.subscribe(cache.invalidate)
+    return cache
@@ -0,0 +1,5 @@
+"""Headless prediction service: ``python serve.py --port 8600`` (see mdp/server.py)."""
+from mdp.server import main
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from mdp.schema import get_schema
+from mdp.server import RequestError, parse_rows
+
+HEART = dict(zip(get_schema('heart').names, [50, 1, 0, 130, 200, 0, 1, 150, 0, 1.0, 1, 0, 2]))
+
+
+def test_valid_record_converts():
+    result = get_schema('heart').convert_records([HEART])
+    assert result.errors == []
+    assert result.X.tolist() == [list(map(float, HEART.values()))]
+
+
+@pytest.mark.parametrize('value', [True, False])
+def test_json_booleans_are_rejected(value):
+    result = get_schema('heart').convert_records([HEART, dict(HEART, fbs=value)])
+    assert [(e.row, e.field, e.value, e.message) for e in result.errors] == [(1, 'fbs', value, 'expected a number')]
+    assert result.valid.tolist() == [True, False]
+
+
+def test_boolean_columns_are_rejected():
+    table = {name: np.array([value, value]) for name, value in HEART.items()}
+    table['exang'] = np.array([True, False])
+    result = get_schema('heart').convert(table)
+    assert [(e.row, e.field) for e in result.errors] == [(0, 'exang'), (1, 'exang')]
+
+
+@pytest.mark.parametrize('value', [[50], [[50]], {'value': 50}])
+def test_nested_cells_are_rejected(value):
+    result = get_schema('heart').convert_records([dict(HEART, age=value), dict(HEART, age=[51])])
+    assert [(e.row, e.field, e.message) for e in result.errors] == [
+        (0, 'age', 'expected a single value'), (1, 'age', 'expected a single value')]
+    assert not result.valid.any()
+
+
+def test_nested_rows_are_rejected():
+    row = list(HEART.values())
+    result = get_schema('heart').convert_rows([[[value] for value in row]])
+    assert len(result.errors) == len(row)
+    assert {e.message for e in result.errors} == {'expected a single value'}
+
+
+def test_api_answers_400_for_booleans_and_nested_values():
+    for instance in (dict(HEART, sex=True), dict(HEART, age=[[50]])):
+        with pytest.raises(RequestError) as raised:
+            parse_rows('heart', {'instances': [instance]})
+        assert raised.value.status == 400
+        assert len(raised.value.fields) == 1